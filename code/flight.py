@@ -1,3 +1,5 @@
+from array import array
+
 class Flight:
     def __init__(self, flight_no, start_city, departure_time, end_city, arrival_time, fare):
         """ Class for the flights
@@ -16,6 +18,84 @@ class Flight:
         self.end_city = end_city
         self.arrival_time = arrival_time
         self.fare = fare
+
+    def __eq__(self, other):
+        if not isinstance(other, Flight):
+            return NotImplemented
+        return self.as_tuple() == other.as_tuple()
+
+    def __hash__(self):
+        return hash(self.as_tuple())
+
+    def __repr__(self):
+        return f"Flight{self.as_tuple()}"
+
+    def as_tuple(self):
+        return (self.flight_no, self.start_city, self.departure_time, self.end_city, self.arrival_time, self.fare)
+
+
+class FlightTable:
+    FIELDS = ("flight_no", "start_city", "departure_time", "end_city", "arrival_time", "fare")
+
+    def __init__(self, flight_no=(), start_city=(), departure_time=(), end_city=(), arrival_time=(), fare=()):
+        """ Column store for the flights
+
+        Each field of Flight is kept in its own typed array, and row i of every column
+        describes the same flight. Rows are the internal flight ids used by the Planner;
+        Flight objects are only created on demand with flight(row).
+
+        Args:
+            flight_no, start_city, departure_time, end_city, arrival_time, fare (Iterable[int]):
+                The columns, all of the same length
+        """
+        self.flight_no = array("q", flight_no)
+        self.start_city = array("q", start_city)
+        self.departure_time = array("q", departure_time)
+        self.end_city = array("q", end_city)
+        self.arrival_time = array("q", arrival_time)
+        self.fare = array("q", fare)
+        if len({len(getattr(self, field)) for field in self.FIELDS}) > 1:
+            raise ValueError("All columns of a FlightTable must have the same length")
+
+    @classmethod
+    def from_flights(cls, flights):
+        """Build a table from a list of Flight objects (row i is flights[i])"""
+        table = cls()
+        for flight in flights:
+            table.append(*flight.as_tuple())
+        return table
+
+    @classmethod
+    def from_buffers(cls, flight_no, start_city, departure_time, end_city, arrival_time, fare):
+        """Wrap existing integer sequences (e.g. memoryviews) as the columns, without copying"""
+        table = cls.__new__(cls)
+        for field, column in zip(cls.FIELDS, (flight_no, start_city, departure_time, end_city, arrival_time, fare)):
+            setattr(table, field, column)
+        if len({len(getattr(table, field)) for field in cls.FIELDS}) > 1:
+            raise ValueError("All columns of a FlightTable must have the same length")
+        return table
+
+    def __len__(self):
+        return len(self.flight_no)
+
+    def append(self, flight_no, start_city, departure_time, end_city, arrival_time, fare):
+        """Add a flight as a new row and return its row id"""
+        self.flight_no.append(flight_no)
+        self.start_city.append(start_city)
+        self.departure_time.append(departure_time)
+        self.end_city.append(end_city)
+        self.arrival_time.append(arrival_time)
+        self.fare.append(fare)
+        return len(self.flight_no) - 1
+
+    def flight(self, row):
+        """Return the Flight stored at the given row"""
+        return Flight(self.flight_no[row], self.start_city[row], self.departure_time[row],
+                      self.end_city[row], self.arrival_time[row], self.fare[row])
+
+    def route(self, rows):
+        """Return List[Flight] for a sequence of rows"""
+        return [self.flight(row) for row in rows]
         
 """
 If there are n flights, and m cities:
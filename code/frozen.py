@@ -0,0 +1,145 @@
+from array import array
+from concurrent.futures import ThreadPoolExecutor
+import threading
+from planner import Planner
+
+class FrozenPlanner(Planner):
+    class LRUCache(Planner.LRUCache):
+        def __init__(self, maxsize):
+            """Planner.LRUCache behind a lock, shared by every reading thread"""
+            super().__init__(maxsize)
+            self.lock = threading.Lock()
+
+        def get(self, key):
+            with self.lock:
+                return super().get(key)
+
+        def put(self, key, value):
+            with self.lock:
+                super().put(key, value)
+
+        def clear(self):
+            with self.lock:
+                super().clear()
+
+    class PerThread(threading.local):
+        """Query state each reading thread keeps for itself"""
+        workspace = None
+        stats = None
+        last_stats = None
+
+    @classmethod
+    def of(cls, planner, cache_size=0, stats=False):
+        """Return a read-only copy of planner that many threads can query at once
+
+        The flights and indexes are copied, so later changes to planner are not seen, and
+        the lazily built reachability and A* city graph are built now. Each thread gets its
+        own Workspace (so memory grows with the number of reading threads); the cache, the
+        A* bounds and the summed stats are shared behind locks.
+
+        Args:
+            planner (Planner): The planner to copy, as it is now
+            cache_size, stats: As for Planner
+        """
+        arrays, scalars = planner.export_arrays()
+        arrays = {name: array("q", values) for name, values in arrays.items()}
+        frozen = cls.from_arrays(arrays, scalars, cache_size, stats, planner.astar)
+        frozen._reachability()
+        frozen._inbound_fares()
+        return frozen
+
+    def _configure(self, backend, queue, cache_size, stats=False, astar=False):
+        self._local = self.PerThread()
+        self._lock = threading.Lock()
+        super()._configure(backend, queue, cache_size, stats, astar)
+
+    # Per-query state of Planner, kept per thread
+    _workspace = property(lambda self: self._local.workspace,
+                          lambda self, workspace: setattr(self._local, "workspace", workspace))
+    _stats = property(lambda self: self._local.stats,
+                      lambda self, stats: setattr(self._local, "stats", stats))
+    last_stats = property(lambda self: self._local.last_stats,
+                          lambda self, stats: setattr(self._local, "last_stats", stats),
+                          doc="SearchStats of this thread's last query")
+
+    def _record(self, stats):
+        with self._lock:
+            super()._record(stats)
+
+    def _lower_bounds(self, end_city):
+        # The search runs outside the lock, so a thread missing the cache never holds up
+        # the others; if two threads compute the same bounds, the first one kept wins
+        with self._lock:
+            bounds = self._cached_bounds(end_city)
+        if bounds is None:
+            bounds = self._compute_bounds(end_city)
+            with self._lock:
+                bounds = self._keep_bounds(end_city, bounds)
+        return bounds
+
+    def set_cache_size(self, cache_size):
+        with self._lock:
+            if self.cache is None:
+                super().set_cache_size(cache_size)
+            else:
+                with self.cache.lock:
+                    super().set_cache_size(cache_size)
+
+    def add_flight(self, flight):
+        raise TypeError("A FrozenPlanner cannot be changed, change the Planner it came from and freeze it again")
+
+    remove_flight = update_flight = add_flight
+
+class PlannerHolder:
+    def __init__(self, planner, cache_size=0, stats=False):
+        """The current FrozenPlanner of a schedule that keeps changing
+
+        Readers query holder.planner, whose version counts the changes it includes.
+        Changes are applied to planner, which the holder keeps to itself, on a background
+        thread that then freezes a new snapshot and swaps it in by replacing one reference:
+        readers never wait, and a query that already holds the old snapshot finishes on it.
+
+        Args:
+            planner (Planner): The schedule, owned by the holder from now on
+            cache_size, stats: Options of every FrozenPlanner published
+        """
+        self._source = planner
+        self._options = {"cache_size": cache_size, "stats": stats}
+        self.planner = FrozenPlanner.of(planner, **self._options)
+        self.planner.version = self.version = 0
+        self._writer = ThreadPoolExecutor(max_workers=1)
+
+    def update(self, change):
+        """Apply change(planner) and publish the result in the background
+
+        Changes are applied one at a time, in the order given. Returns a Future of the new
+        FrozenPlanner, which raises what change raised (the old snapshot stays current).
+        """
+        return self._writer.submit(self._apply, change)
+
+    def _apply(self, change):
+        change(self._source)
+        frozen = FrozenPlanner.of(self._source, **self._options)
+        frozen.version = self.version + 1
+        self.planner = frozen
+        self.version = frozen.version
+        return frozen
+
+    def add_flight(self, flight):
+        return self.update(lambda planner: planner.add_flight(flight))
+
+    def remove_flight(self, flight_no):
+        return self.update(lambda planner: planner.remove_flight(flight_no))
+
+    def update_flight(self, flight_no, departure_time=None, arrival_time=None, fare=None):
+        return self.update(lambda planner: planner.update_flight(flight_no, departure_time, arrival_time, fare))
+
+    def close(self):
+        """Wait for the pending changes and stop the background thread"""
+        self._writer.shutdown()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,95 @@
+from array import array
+from flight import FlightTable
+
+CHUNK_SIZE = 1 << 20
+
+class IntReader:
+    def __init__(self, file, chunk_size=CHUNK_SIZE):
+        """Whitespace separated integers of a binary file, read in chunks
+
+        Each chunk is split and converted in one pass into an array, so no per-line Python
+        work is done; a number cut by the chunk boundary is carried over to the next chunk.
+
+        Args:
+            file: A file opened in binary mode
+            chunk_size (int): Bytes read at a time
+        """
+        self.file = file
+        self.chunk_size = chunk_size
+        self.buffer = array("q")
+        self.pos = 0
+        self.tail = b""
+
+    def _fill(self):
+        data = self.file.read(self.chunk_size)
+        if not data and not self.tail:
+            return False
+        if data:
+            # The last number may continue in the next chunk
+            data = self.tail + data
+            cut = len(data.rstrip(b"+-0123456789"))
+            data, self.tail = data[:cut], data[cut:]
+        else:
+            data, self.tail = self.tail, b""
+        self.buffer = self.buffer[self.pos:]
+        self.buffer.extend(map(int, data.split()))
+        self.pos = 0
+        return True
+
+    def take(self, k):
+        """Return the next k integers as an array"""
+        while len(self.buffer) - self.pos < k:
+            if not self._fill():
+                raise ValueError(f"Unexpected end of file, wanted {k} more numbers")
+        values = self.buffer[self.pos:self.pos + k]
+        self.pos += k
+        return values
+
+    def take_one(self):
+        return self.take(1)[0]
+
+def _columns(block, width):
+    """Split a row-major block of numbers into width column arrays"""
+    return [block[i::width] for i in range(width)]
+
+def read_test_cases(path, chunk_size=CHUNK_SIZE):
+    """Stream the test cases of a multi-test-case file (the fli1000.txt format)
+
+    The file holds the number of test cases, then for each one: the number of flights n,
+    n lines "flight_no start_city departure_time end_city arrival_time fare" and a line
+    "start_city end_city t1 t2". Only the test case being yielded is held in memory.
+
+    Yields:
+        Tuple[FlightTable, int, int, int, int]: The flights and the query of a test case
+    """
+    with open(path, "rb") as file:
+        reader = IntReader(file, chunk_size)
+        for _ in range(reader.take_one()):
+            n = reader.take_one()
+            table = FlightTable(*_columns(reader.take(6 * n), 6))
+            start_city, end_city, t1, t2 = reader.take(4)
+            yield table, start_city, end_city, t1, t2
+
+def read_edge_list(path, chunk_size=CHUNK_SIZE):
+    """Read an edge-list file (the C.txt format) into a FlightTable
+
+    The file holds "n m" (cities and flights), then m lines
+    "start_city end_city fare departure_time arrival_time". Flight numbers are the line
+    order, starting at 0. Lines are converted chunk by chunk straight into the columns.
+    """
+    table = FlightTable()
+    with open(path, "rb") as file:
+        reader = IntReader(file, chunk_size)
+        reader.take_one()
+        m = reader.take_one()
+        batch = max(1, chunk_size // 32)
+        while len(table) < m:
+            k = min(batch, m - len(table))
+            start_city, end_city, fare, departure_time, arrival_time = _columns(reader.take(5 * k), 5)
+            table.flight_no.extend(range(len(table), len(table) + k))
+            table.start_city.extend(start_city)
+            table.departure_time.extend(departure_time)
+            table.end_city.extend(end_city)
+            table.arrival_time.extend(arrival_time)
+            table.fare.extend(fare)
+    return table
@@ -0,0 +1,109 @@
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+import os
+from planner import Planner
+
+class SharedPlanner:
+    def __init__(self, planner):
+        """A Planner's flight table and indexes published in one shared memory block
+
+        Every array of Planner.export_arrays is stored as int64 in a single SharedMemory
+        segment. spec is a small picklable description of it; attach(spec) turns it back
+        into a Planner reading memoryviews of the segment, so a worker process maps the
+        flights instead of unpickling them.
+
+        Args:
+            planner (Planner): The planner to publish, later updates to it are not seen
+        """
+        arrays, scalars = planner.export_arrays()
+        layout = {}
+        size = 0
+        for name, values in arrays.items():
+            layout[name] = (size, len(values))
+            size += 8 * len(values)
+        self.shm = shared_memory.SharedMemory(create=True, size=max(size, 1))
+        for name, values in arrays.items():
+            start, length = layout[name]
+            self.shm.buf[start:start + 8 * length].cast("q")[:] = array("q", values)
+        self.spec = (self.shm.name, layout, scalars)
+
+    def close(self):
+        """Release the segment, once no process uses it any more"""
+        self.shm.close()
+        self.shm.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def attach(spec):
+    """Return (Planner, SharedMemory) for a published spec
+
+    The Planner reads the segment in place, the SharedMemory must outlive it.
+    """
+    name, layout, scalars = spec
+    shm = shared_memory.SharedMemory(name=name)
+    arrays = {key: shm.buf[start:start + 8 * length].cast("q") for key, (start, length) in layout.items()}
+    return Planner.from_arrays(arrays, scalars), shm
+
+_worker = None      # (Planner, SharedMemory) of a worker process
+
+def _init_worker(spec):
+    global _worker
+    _worker = attach(spec)
+
+def _run_chunk(chunk, objectives):
+    indices = [i for i, query in chunk]
+    rows = _worker[0]._batch_rows([query for i, query in chunk], objectives)
+    return list(zip(indices, rows))
+
+class ParallelPlanner:
+    def __init__(self, planner, workers=None):
+        """Answers batches of queries on a pool of processes sharing one published Planner
+
+        The planner is published once through SharedPlanner and every worker attaches to
+        it when it starts. Workers send back rows only; routes are built from the
+        planner's own table.
+
+        Args:
+            planner (Planner): The planner to serve, as it is now
+            workers (int): Number of worker processes, the CPU count by default
+        """
+        self.planner = planner
+        self.workers = workers or os.cpu_count() or 1
+        self.shared = SharedPlanner(planner)
+        self.pool = ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker,
+                                        initargs=(self.shared.spec,))
+
+    def batch_query(self, queries, objectives=Planner.OBJECTIVES, chunks_per_worker=4):
+        """Planner.batch_query spread over the workers
+
+        Queries sharing a start city and time window stay in the same chunk so they still
+        share one search; chunks are balanced by number of queries.
+        """
+        queries = [tuple(query) for query in queries]
+        groups = {}
+        for i, query in enumerate(queries):
+            groups.setdefault((query[0], query[2], query[3]), []).append((i, query))
+        chunks = [[] for i in range(max(1, min(len(groups), self.workers * chunks_per_worker)))]
+        for group in sorted(groups.values(), key=len, reverse=True):
+            min(chunks, key=len).extend(group)
+
+        results = [None] * len(queries)
+        for part in self.pool.map(_run_chunk, chunks, [objectives] * len(chunks)):
+            for i, routes in part:
+                results[i] = tuple(self.planner.table.route(rows) for rows in routes)
+        return results
+
+    def close(self):
+        self.pool.shutdown()
+        self.shared.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -1,76 +1,558 @@
-from flight import Flight
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict
+import heapq
+import json
+import mmap as mmap_module
+import sys
+import time
+from flight import Flight, FlightTable
 
 class Planner:
-    def __init__(self, flights):
+    BACKENDS = ("bfs", "csa")
+    QUEUES = ("binary", "dial", "radix")
+    OBJECTIVES = ("least_flights_earliest", "cheapest", "least_flights_cheapest")
+
+    def __init__(self, flights, backend="bfs", queue="binary", cache_size=0, stats=False, astar=False,
+                 min_connection=20):
         """The Planner
 
         Args:
-            flights (List[Flight]): A list of information of all the flights (objects of class Flight)
+            flights (List[Flight] | FlightTable): All the flights, either as objects of class
+                Flight or already in columnar form. The planner only keeps the FlightTable,
+                routes are returned as new Flight objects built from it
+            backend (str): Engine used by least_flights_earliest_route, "bfs" (one search per
+                start candidate) or "csa" (Connection Scan over the departure-sorted flights)
+            queue (str): Priority queue of the fare searches, "binary" (IndexedHeap), "dial"
+                (BucketQueue, for small integer fares) or "radix" (RadixHeap, for wide fare
+                ranges). The (flights, fare) search needs a wide key range, so it uses a
+                RadixHeap when "dial" is selected, and so do all searches once a fare
+                exceeds DIAL_MAX_FARE
+            cache_size (int): Number of query results kept in an LRU cache, 0 disables it
+            stats (bool): Collect SearchStats for every query, see set_stats
+            astar (bool): Guide the fare searches (cheapest_route and
+                least_flights_cheapest_route) towards end_city with lower bounds on the
+                remaining fare and flights. Fares must be non-negative, as for Dijkstra
+            min_connection (int | Dict[int, int]): Minimum time between arriving in a city
+                and departing from it, for every city or per city (cities not listed get
+                DEFAULT_MIN_CONNECTION)
         """ 
+        self._configure(backend, queue, cache_size, stats, astar)
+        if not isinstance(flights, FlightTable):
+            flights = FlightTable.from_flights(flights)
+        self.table = flights
         self.m = len(flights)
-        self.n = 0
-        for flight in flights:
-            self.n = max(self.n, flight.start_city, flight.end_city)
-        self.n += 1
-        self.cities = [[] for i in range(self.n)]
-        for i in flights:
-            self.cities[i.start_city].append(i)
+        self.n = max(max(flights.start_city, default=-1), max(flights.end_city, default=-1)) + 1
+        departure, arrival = flights.departure_time, flights.arrival_time
+        self.connections = sorted(range(self.m), key=departure.__getitem__)
+
+        # Flights out of each city in departure order, with their departure times alongside,
+        # so a search can bisect to the first flight it can connect to
+        cities = [[] for i in range(self.n)]
+        for i in self.connections:
+            cities[flights.start_city[i]].append(i)
+        self.cities = [array("q", rows) for rows in cities]
+        self.departures = [array("q", [departure[i] for i in rows]) for rows in cities]
+
+        # Transfer ranges: the flights that can follow flight i are the ones of its end
+        # city's bucket from transfers[i] on (up to the query's t2)
+        self._set_connection_times(min_connection)
+        end, wait = flights.end_city, self.connection_times
+        self.transfers = array("q", [bisect_left(self.departures[end[i]], arrival[i] + wait[end[i]])
+                                     for i in range(self.m)])
+
+        # Connection Scan arrays: flights by departure, and the same flights by the
+        # time they become available for a connection (arrival + connection time)
+        self.connection_departures = [departure[i] for i in self.connections]
+        release = [arrival[i] + wait[end[i]] for i in range(self.m)]
+        self.releases = sorted(range(self.m), key=release.__getitem__)
+        self.release_times = [release[i] for i in self.releases]
+        # Keys of the (flights, fare) search are encoded as flights * hop_weight + fare; no
+        # route costs more than all fares together, so the flight count always dominates
+        self.hop_weight = sum(flights.fare) + 1
+        self.max_fare = max(flights.fare, default=0)
+        self._reachability()
+
+    DEFAULT_MIN_CONNECTION = 20
+
+    def _set_connection_times(self, min_connection):
+        """Store min_connection as default_connection and the per-city connection_times"""
+        if isinstance(min_connection, int):
+            default, per_city = min_connection, {}
+        else:
+            default, per_city = self.DEFAULT_MIN_CONNECTION, dict(min_connection)
+        if default < 0 or any(wait < 0 for wait in per_city.values()):
+            raise ValueError("Minimum connection times must be non-negative")
+        self.default_connection = default
+        self.connection_times = array("q", [default]) * max([self.n] + [city + 1 for city in per_city])
+        for city, wait in per_city.items():
+            self.connection_times[city] = wait
+
+    def _configure(self, backend, queue, cache_size, stats=False, astar=False):
+        """Options and per-query state shared by every way of building a Planner"""
+        if backend not in self.BACKENDS:
+            raise ValueError(f"Unknown backend {backend!r}, expected one of {self.BACKENDS}")
+        if queue not in self.QUEUES:
+            raise ValueError(f"Unknown queue {queue!r}, expected one of {self.QUEUES}")
+        self.backend = backend
+        self.queue = queue
+        self.astar = astar
+        self._reach = None          # built by _reachability, None when it must be rebuilt
+        self._city_graph = None     # built by _inbound_fares on the first A* query
+        self._bounds = OrderedDict()
+        self._row_of = None         # flight_no -> row, built on the first schedule update
+        self._arrivals = None       # rows into each city, built on the first schedule update
+        self._workspace = None
+        self.cache = None
+        self.set_cache_size(cache_size)
+        self._stats = None          # SearchStats of the query being answered, when enabled
+        self.set_stats(stats)
+
+    BOUNDS_CACHED = 64     # destinations whose A* lower bounds are kept
+    DIAL_MAX_FARE = 100000  # Dial keeps one bucket per fare value, wider fares use a RadixHeap
+
+    INDEX_ARRAYS = ("city_offsets", "city_rows", "city_departures", "connections",
+                    "connection_departures", "releases", "release_times", "transfers",
+                    "connection_times", "component", "reach", "first_arrival")
+
+    def export_arrays(self):
+        """The flight table and every index as flat integer sequences
+
+        Returns:
+            Tuple[Dict[str, Sequence[int]], Dict]: Arrays named by FlightTable.FIELDS and
+                INDEX_ARRAYS (the per-city buckets flattened, city c at
+                city_offsets[c]:city_offsets[c + 1]; the reach bitsets of _reachability
+                as reach_words int64 words each, least significant first; sys.maxsize for
+                a city no flight arrives in), and the scalar options and bounds needed by
+                from_arrays
+        """
+        city_offsets, city_rows, city_departures = array("q", [0]), array("q"), array("q")
+        for rows, departures in zip(self.cities, self.departures):
+            city_rows.extend(rows)
+            city_departures.extend(departures)
+            city_offsets.append(len(city_rows))
+        component, reach, first_arrival = self._reachability()
+        words = max(1, (len(reach) + 63) // 64)
+        packed = array("q")
+        for bits in reach:
+            packed.frombytes(bits.to_bytes(8 * words, "little"))
+        if sys.byteorder == "big":
+            packed.byteswap()
+        arrays = {field: getattr(self.table, field) for field in FlightTable.FIELDS}
+        arrays.update(city_offsets=city_offsets, city_rows=city_rows, city_departures=city_departures,
+                      connections=self.connections, connection_departures=self.connection_departures,
+                      releases=self.releases, release_times=self.release_times,
+                      transfers=self.transfers, connection_times=self.connection_times,
+                      component=component, reach=packed,
+                      first_arrival=[sys.maxsize if time == float('inf') else time for time in first_arrival])
+        scalars = {"backend": self.backend, "queue": self.queue, "hop_weight": self.hop_weight,
+                   "max_fare": self.max_fare, "default_connection": self.default_connection,
+                   "reach_words": words}
+        return arrays, scalars
+
+    @classmethod
+    def from_arrays(cls, arrays, scalars, cache_size=0, stats=False, astar=False):
+        """Build a Planner over the output of export_arrays without copying or re-sorting
+
+        The arrays may be any indexable integer sequences, e.g. memoryviews of shared
+        memory. The indexes are used as they are, so nothing is parsed or sorted.
+        """
+        planner = cls.__new__(cls)
+        planner._configure(scalars["backend"], scalars["queue"], cache_size, stats, astar)
+        planner.table = FlightTable.from_buffers(*(arrays[field] for field in FlightTable.FIELDS))
+        planner.m = len(planner.table)
+        offsets = arrays["city_offsets"]
+        planner.n = len(offsets) - 1
+        planner.cities = [arrays["city_rows"][offsets[c]:offsets[c + 1]] for c in range(planner.n)]
+        planner.departures = [arrays["city_departures"][offsets[c]:offsets[c + 1]] for c in range(planner.n)]
+        for name in ("connections", "connection_departures", "releases", "release_times",
+                     "transfers", "connection_times"):
+            setattr(planner, name, arrays[name])
+        planner.hop_weight = scalars["hop_weight"]
+        planner.max_fare = scalars["max_fare"]
+        planner.default_connection = scalars["default_connection"]
+        reach = cls.PackedReach(arrays["reach"], scalars["reach_words"])
+        planner._reach = (arrays["component"], reach, arrays["first_arrival"])
+        return planner
+
+    # Snapshot file: MAGIC, the format version and the header size as little-endian uint32,
+    # a JSON header (scalars, and each array's offset and length), then the arrays as int64.
+    # Offsets count from the first multiple of 8 after the header.
+    MAGIC = b"FLTPLAN\0"
+    FORMAT_VERSION = 3
+
+    def save(self, path):
+        """Write the flights and all indexes to a binary snapshot that load can map"""
+        arrays, scalars = self.export_arrays()
+        layout = {}
+        offset = 0
+        for name, values in arrays.items():
+            layout[name] = (offset, len(values))
+            offset += 8 * len(values)
+        header = json.dumps({"byteorder": sys.byteorder, "scalars": scalars, "layout": layout}).encode()
+        with open(path, "wb") as file:
+            file.write(self.MAGIC)
+            file.write(self.FORMAT_VERSION.to_bytes(4, "little"))
+            file.write(len(header).to_bytes(4, "little"))
+            file.write(header)
+            file.write(b"\0" * (-file.tell() % 8))
+            for values in arrays.values():
+                file.write(array("q", values).tobytes())
+
+    @classmethod
+    def load(cls, path, mmap=True, cache_size=0, stats=False, astar=False):
+        """Open a snapshot written by save
+
+        Args:
+            path (str): The snapshot file
+            mmap (bool): Map the file and read the arrays in place, so opening costs the
+                header and the per-city offsets and pages are read when queries touch them.
+                Otherwise the arrays are read into memory
+            cache_size, stats, astar: As for Planner
+        """
+        with open(path, "rb") as file:
+            if file.read(len(cls.MAGIC)) != cls.MAGIC:
+                raise ValueError(f"{path} is not a Planner snapshot")
+            version = int.from_bytes(file.read(4), "little")
+            if version != cls.FORMAT_VERSION:
+                raise ValueError(f"{path} has snapshot version {version}, expected {cls.FORMAT_VERSION}")
+            header = json.loads(file.read(int.from_bytes(file.read(4), "little")))
+            data = file.tell() + (-file.tell() % 8)
+            native = header["byteorder"] == sys.byteorder
+            if mmap and native:
+                buffer = mmap_module.mmap(file.fileno(), 0, access=mmap_module.ACCESS_READ)
+                view = memoryview(buffer)
+                arrays = {name: view[data + offset:data + offset + 8 * length].cast("q")
+                          for name, (offset, length) in header["layout"].items()}
+            else:
+                buffer = None
+                arrays = {}
+                for name, (offset, length) in header["layout"].items():
+                    file.seek(data + offset)
+                    arrays[name] = array("q")
+                    arrays[name].frombytes(file.read(8 * length))
+                    if not native:
+                        arrays[name].byteswap()
+        planner = cls.from_arrays(arrays, header["scalars"], cache_size, stats, astar)
+        planner._buffer = buffer     # the mapping must live as long as the views into it
+        return planner
     
-    class Flights_modified:
-        def __init__(self, flight, previous):
-            self.flight = flight
-            self.flight_no=flight.flight_no
-            self.start_city=flight.start_city
-            self.departure_time=flight.departure_time
-            self.end_city=flight.end_city
-            self.arrival_time=flight.arrival_time
-            self.fare=flight.fare
-            self.previous=previous
-
-    class Heap:    
-        def __init__(self, comparison_function, init_array):
-            self.compare=comparison_function
-            self.data=init_array
-            for i in range(len(init_array)-1,-1,-1):
-                self.downheap(i)
-            
-        def upheap(self, index):
-            parent = (index - 1) // 2
-            if index > 0 and self.compare(self.data[index], self.data[parent]):
-                self.data[index], self.data[parent] = self.data[parent], self.data[index]
-                self.upheap(parent)
-        
-        def downheap(self, index):
-            left_child = 2 * index + 1
-            right_child = 2 * index + 2
-            smallest = index
-            if left_child < len(self.data) and self.compare(self.data[left_child], self.data[smallest]):
-                smallest = left_child
-            if right_child < len(self.data) and self.compare(self.data[right_child], self.data[smallest]):
-                smallest = right_child
-            if smallest != index:
-                self.data[index], self.data[smallest] = self.data[smallest], self.data[index]
-                self.downheap(smallest)
-            
-        def insert(self, value):
-            self.data.append(value)
-            self.upheap(len(self.data) - 1)
-        
-        def extract(self):
-            if len(self.data) == 0:
-                return None
-            if len(self.data) == 1:
-                return self.data.pop()
-            top_value = self.data[0]
-            self.data[0] = self.data.pop()
-            self.downheap(0)        
-            return top_value
-        
-        def top(self):
-            if len(self.data) == 0:
-                return None
-            return self.data[0]
-        
+    class LRUCache:
+        def __init__(self, maxsize):
+            """Query results by (objective, start_city, end_city, t1, t2), least recently used evicted first"""
+            self.maxsize = maxsize
+            self.data = OrderedDict()
+            self.hits = 0
+            self.misses = 0
+
+        def __len__(self):
+            return len(self.data)
+
+        def get(self, key):
+            value = self.data.get(key)
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self.data.move_to_end(key)
+            return value
+
+        def put(self, key, value):
+            self.data[key] = value
+            self.data.move_to_end(key)
+            while len(self.data) > self.maxsize:
+                self.data.popitem(last=False)
+
+        def clear(self):
+            self.data.clear()
+
+    class PackedReach:
+        def __init__(self, packed, words):
+            """The reach bitsets of export_arrays, each turned back into an int on first use
+
+            Args:
+                packed (Sequence[int]): words int64 words per component
+                words (int): Words per bitset
+            """
+            self.packed = packed
+            self.words = words
+            self.bits = {}
+
+        def __len__(self):
+            return len(self.packed) // self.words
+
+        def __getitem__(self, k):
+            bits = self.bits.get(k)
+            if bits is None:
+                block = array("q", self.packed[k * self.words:(k + 1) * self.words])
+                if sys.byteorder == "big":
+                    block.byteswap()
+                self.bits[k] = bits = int.from_bytes(block.tobytes(), "little")
+            return bits
+
+        def __iter__(self):
+            return (self[k] for k in range(len(self)))
+
+    class SearchStats:
+        COUNTERS = ("queries", "rejected", "cache_hits", "candidates", "pops", "relaxations")
+
+        def __init__(self):
+            """Work done by one query, or summed over many with + / +=
+
+            queries: queries answered; rejected: queries the reachability index answered
+            without a search; cache_hits: answers found in the cache; candidates:
+            first flights tried out of the start city; pops: flights taken from the queue
+            (scanned, for the Connection Scan); relaxations: onward flights examined;
+            max_queue: the largest queue seen (the maximum when summed); phases: wall
+            time in seconds by phase ("cache", "search", "routes").
+            """
+            for counter in self.COUNTERS:
+                setattr(self, counter, 0)
+            self.max_queue = 0
+            self.phases = {}
+
+        def count(self, candidates, pops, relaxations, max_queue):
+            self.candidates += candidates
+            self.pops += pops
+            self.relaxations += relaxations
+            self.max_queue = max(self.max_queue, max_queue)
+
+        def add_phase(self, phase, seconds):
+            self.phases[phase] = self.phases.get(phase, 0.0) + seconds
+
+        def __iadd__(self, other):
+            for counter in self.COUNTERS:
+                setattr(self, counter, getattr(self, counter) + getattr(other, counter))
+            self.max_queue = max(self.max_queue, other.max_queue)
+            for phase, seconds in other.phases.items():
+                self.add_phase(phase, seconds)
+            return self
+
+        def __add__(self, other):
+            total = Planner.SearchStats()
+            total += self
+            total += other
+            return total
+
+        def as_dict(self):
+            stats = {counter: getattr(self, counter) for counter in self.COUNTERS}
+            stats["max_queue"] = self.max_queue
+            stats["phases"] = dict(self.phases)
+            return stats
+
+        def __repr__(self):
+            return f"SearchStats({self.as_dict()})"
+
+    class Workspace:
+        def __init__(self, m, heap, lex_heap):
+            """Per-flight search state, indexed by row and reused across queries
+
+            Kernels record every row they write in touched, so reset() only restores
+            the entries the last search used instead of reallocating m-sized arrays.
+            """
+            inf = float('inf')
+            self.label = [inf] * m          # fare / hops / (hops, fare) of the best route to a flight
+            self.hops = [inf] * m
+            self.next_label = [inf] * m     # tentative labels of the next round (plan_all)
+            self.pred = array("q", [-1]) * m
+            self.first_pred = array("q", [-1]) * m
+            self.next_pred = array("q", [-1]) * m
+            self.touched = []
+            self.queue = Planner.Queue(m)
+            self.heap = heap                # queue of the cheapest-fare search
+            self.lex_heap = lex_heap        # queue of the (flights, fare) search
+
+        def reset(self):
+            inf = float('inf')
+            for i in self.touched:
+                self.label[i] = self.hops[i] = self.next_label[i] = inf
+                self.pred[i] = self.first_pred[i] = self.next_pred[i] = -1
+            self.touched.clear()
+            self.queue.clear()
+            self.heap.clear()
+            self.lex_heap.clear()
+
+        def grow(self, m):
+            """Make room for rows added since the Workspace was built"""
+            extra = m - len(self.label)
+            inf = float('inf')
+            for labels in (self.label, self.hops, self.next_label):
+                labels.extend([inf] * extra)
+            for preds in (self.pred, self.first_pred, self.next_pred):
+                preds.extend(array("q", [-1]) * extra)
+            self.reset()
+            self.queue.grow(m)
+            self.heap.grow(m)
+            self.lex_heap.grow(m)
+
+        def chain(self, row, pred=None):
+            """Rows of the route ending at row, following pred (self.pred by default)"""
+            pred = self.pred if pred is None else pred
+            rows = []
+            while row != -1:
+                rows.append(row)
+                row = pred[row]
+            return rows[::-1]
+
+    class IndexedHeap:
+        def __init__(self, capacity):
+            """Min-heap of item ids in range(capacity) with decrease-key, on top of heapq
+
+            Keys are compared with < directly (ints or tuples). A lower key pushes a new
+            (key, item) entry and key[item] remembers the current one, so the entries it
+            replaced are skipped when they come out: heapq's sifting in C is faster than
+            moving an entry in place with Python code. len() counts queued items, not entries.
+            """
+            self.entries = []
+            self.key = [None] * capacity    # key of each queued item, None when not queued
+            self.size = 0
+
+        def __len__(self):
+            return self.size
+
+        def push(self, item, key):
+            """Insert item, or lower its key if it is already queued with a larger one"""
+            current = self.key[item]
+            if current is None:
+                self.size += 1
+            elif not key < current:
+                return
+            self.key[item] = key
+            heapq.heappush(self.entries, (key, item))
+
+        def pop(self):
+            """Remove and return (item, key) with the smallest key"""
+            entries, keys = self.entries, self.key
+            while True:
+                key, item = heapq.heappop(entries)
+                if keys[item] == key:
+                    keys[item] = None
+                    self.size -= 1
+                    return item, key
+
+        def clear(self):
+            for key, item in self.entries:
+                self.key[item] = None
+            self.entries.clear()
+            self.size = 0
+
+        def grow(self, capacity):
+            self.key.extend([None] * (capacity - len(self.key)))
+
+    class BucketQueue:
+        def __init__(self, capacity, max_step):
+            """Dial's monotone bucket queue for non-negative integer keys
+
+            Keys in the queue never exceed the last popped key by more than max_step (the
+            largest fare), so max_step + 1 circular buckets hold them all. A decreased key
+            is appended to its new bucket and the old entry is skipped when reached.
+            """
+            self.width = max_step + 1
+            self.buckets = [[] for i in range(self.width)]
+            self.used = []          # buckets that may hold entries, for clear()
+            self.key = [None] * capacity
+            self.size = 0
+            self.cursor = 0
+
+        def __len__(self):
+            return self.size
+
+        def push(self, item, key):
+            old = self.key[item]
+            if old is None:
+                self.size += 1
+            elif key >= old:
+                return
+            self.key[item] = key
+            bucket = self.buckets[key % self.width]
+            if not bucket:
+                self.used.append(key % self.width)
+            bucket.append(item)
+
+        def pop(self):
+            keys, buckets, width = self.key, self.buckets, self.width
+            while True:
+                bucket = buckets[self.cursor % width]
+                while bucket:
+                    item = bucket.pop()
+                    if keys[item] == self.cursor:
+                        keys[item] = None
+                        self.size -= 1
+                        return item, self.cursor
+                self.cursor += 1
+
+        def clear(self):
+            for b in self.used:
+                for item in self.buckets[b]:
+                    self.key[item] = None
+                self.buckets[b].clear()
+            self.used.clear()
+            self.size = 0
+            self.cursor = 0
+
+        def grow(self, capacity):
+            self.key.extend([None] * (capacity - len(self.key)))
+
+    class RadixHeap:
+        def __init__(self, capacity):
+            """Monotone radix heap for non-negative integer keys of any size
+
+            Bucket i holds keys whose highest bit differing from the last popped key is
+            bit i - 1, so there is one bucket per key bit rather than one per key value.
+            When bucket 0 runs dry, the next non-empty bucket is split around its minimum.
+            """
+            self.buckets = [[]]
+            self.key = [None] * capacity
+            self.last = 0
+            self.size = 0
+
+        def __len__(self):
+            return self.size
+
+        def push(self, item, key):
+            old = self.key[item]
+            if old is None:
+                self.size += 1
+            elif key >= old:
+                return
+            self.key[item] = key
+            b = (key ^ self.last).bit_length()
+            while len(self.buckets) <= b:
+                self.buckets.append([])
+            self.buckets[b].append(item)
+
+        def pop(self):
+            keys, buckets = self.key, self.buckets
+            while True:
+                bucket = buckets[0]
+                while bucket:
+                    item = bucket.pop()
+                    if keys[item] == self.last:
+                        keys[item] = None
+                        self.size -= 1
+                        return item, self.last
+                i = 1
+                while not buckets[i]:
+                    i += 1
+                # Entries of popped items or of keys that were decreased since are stale
+                live = [item for item in buckets[i] if keys[item] is not None]
+                buckets[i] = []
+                if live:
+                    self.last = min(keys[item] for item in live)
+                    for item in live:
+                        buckets[(keys[item] ^ self.last).bit_length()].append(item)
+
+        def clear(self):
+            for bucket in self.buckets:
+                for item in bucket:
+                    self.key[item] = None
+                bucket.clear()
+            self.size = 0
+            self.last = 0
+
+        def grow(self, capacity):
+            self.key.extend([None] * (capacity - len(self.key)))
+
     class Queue:
         def __init__(self,m):
             self._val=[None]*m
@@ -96,16 +578,486 @@ class Planner:
             if self.empty():
                 raise ValueError("Queue is empty")
             return self._val[self.front]
+        def clear(self):
+            self.front=-1
+            self.size=0
+        def grow(self, m):
+            if not self.empty():
+                raise ValueError("Queue must be empty to grow")
+            self._val.extend([None]*(m-len(self._val)))
         
-    def comparison(self, a, b):
-        if a[0] == b[0]:
-            return a[1].arrival_time < b[1].arrival_time
-        return a[0] < b[0]
-    
-    def comparison2(self, a, b):
-        if a[0] == b[0]:
-            return a[1] < b[1]
-        return a[0] < b[0]
+    def set_cache_size(self, cache_size):
+        """Resize the query cache, keeping the most recent results; 0 turns it off"""
+        if cache_size < 0:
+            raise ValueError("cache_size must be non-negative")
+        if cache_size == 0:
+            self.cache = None
+        elif self.cache is None:
+            self.cache = self.LRUCache(cache_size)
+        else:
+            self.cache.maxsize = cache_size
+            while len(self.cache) > cache_size:
+                self.cache.data.popitem(last=False)
+
+    def clear_cache(self):
+        """Drop every cached result, needed whenever the flights change"""
+        if self.cache is not None:
+            self.cache.clear()
+
+    def set_stats(self, enabled):
+        """Turn per-query statistics on or off
+
+        When on, last_stats holds the SearchStats of the last query (or batch) and stats
+        their sum since stats were turned on. When off both are None and the searches
+        only skip a few integer updates.
+        """
+        self.stats = self.SearchStats() if enabled else None
+        self.last_stats = None
+
+    def add_flight(self, flight):
+        """Add a flight to the schedule in place
+
+        Only the flight's own city bucket and the connection-scan arrays are touched,
+        queries afterwards see the same network as a fresh Planner would.
+
+        Args:
+            flight (Flight): The new flight, its flight_no must not be in use
+        """
+        row_of = self._rows()
+        if flight.flight_no in row_of:
+            raise ValueError(f"Flight {flight.flight_no} is already scheduled")
+        row = self.table.append(*flight.as_tuple())
+        row_of[flight.flight_no] = row
+        self.m = len(self.table)
+        top = max(flight.start_city, flight.end_city)
+        while self.n <= top:
+            self.cities.append(array("q"))
+            self.departures.append(array("q"))
+            self.n += 1
+        while len(self.connection_times) < self.n:
+            self.connection_times.append(self.default_connection)
+        self.hop_weight += flight.fare
+        self.max_fare = max(self.max_fare, flight.fare)
+        self._index(row)
+        self._cheaper_edge(row)
+        self.clear_cache()
+
+    def remove_flight(self, flight_no):
+        """Remove a flight from the schedule in place and return it as a Flight
+
+        The row stays in the table but is no longer reachable from any index.
+        """
+        row_of = self._rows()
+        if flight_no not in row_of:
+            raise ValueError(f"Flight {flight_no} is not scheduled")
+        row = row_of.pop(flight_no)
+        self._unindex(row)
+        self.clear_cache()
+        return self.table.flight(row)
+
+    def update_flight(self, flight_no, departure_time=None, arrival_time=None, fare=None):
+        """Change the times (a delay) and/or the fare of a flight in place and return it
+
+        Args:
+            flight_no (int): The flight to change
+            departure_time, arrival_time, fare (int): New values, None keeps the current one
+        """
+        row_of = self._rows()
+        if flight_no not in row_of:
+            raise ValueError(f"Flight {flight_no} is not scheduled")
+        row = row_of[flight_no]
+        self._unindex(row)
+        if departure_time is not None:
+            self.table.departure_time[row] = departure_time
+        if arrival_time is not None:
+            self.table.arrival_time[row] = arrival_time
+        cheaper = fare is not None and fare < self.table.fare[row]
+        if fare is not None:
+            # hop_weight only has to stay above every route's fare, so it never shrinks
+            self.hop_weight += max(0, fare - self.table.fare[row])
+            self.max_fare = max(self.max_fare, fare)
+            self.table.fare[row] = fare
+        self._index(row)
+        if cheaper:
+            self._cheaper_edge(row)
+        self.clear_cache()
+        return self.table.flight(row)
+
+    def _own_arrays(self):
+        """Copy arrays borrowed from shared memory or a mapped snapshot before changing them"""
+        if isinstance(self.connections, list):
+            return
+        self.table = FlightTable(*(getattr(self.table, field) for field in FlightTable.FIELDS))
+        self.cities = [array("q", rows) for rows in self.cities]
+        self.departures = [array("q", departures) for departures in self.departures]
+        for name in ("connections", "connection_departures", "releases", "release_times"):
+            setattr(self, name, list(getattr(self, name)))
+        self.transfers = array("q", self.transfers)
+        self.connection_times = array("q", self.connection_times)
+        if self._reach is not None:
+            component, reach, first_arrival = self._reach
+            self._reach = (list(component), list(reach), list(first_arrival))
+
+    def _rows(self):
+        self._own_arrays()
+        if self._row_of is None:
+            # Removed flights keep their rows in the table, only the indexed ones are scheduled
+            flight_no = self.table.flight_no
+            self._row_of = {flight_no[row]: row for rows in self.cities for row in rows}
+        return self._row_of
+
+    def _cheaper_edge(self, row):
+        """Lower the city graph edge of a flight that was added or got cheaper, in place
+
+        The A* bounds are only dropped when the edge got cheaper: a removed flight, a higher
+        fare or a new time leaves them lower bounds that never decrease along a connection.
+        """
+        inbound = self._city_graph
+        if inbound is None:
+            return
+        while len(inbound) < self.n:
+            inbound.append({})
+        city, end, fare = self.table.start_city[row], self.table.end_city[row], self.table.fare[row]
+        if fare < inbound[end].get(city, float('inf')):
+            inbound[end][city] = fare
+            self._bounds.clear()
+
+    def _inbound(self):
+        """Per city, the rows of the scheduled flights into it, built on the first update"""
+        if self._arrivals is None:
+            end = self.table.end_city
+            self._arrivals = [[] for i in range(self.n)]
+            for rows in self.cities:
+                for row in rows:
+                    self._arrivals[end[row]].append(row)
+        while len(self._arrivals) < self.n:
+            self._arrivals.append([])
+        return self._arrivals
+
+    def _retarget(self, city):
+        """Recompute the transfer ranges pointing into city's bucket after it changed"""
+        departures, wait, arrival = self.departures[city], self.connection_times[city], self.table.arrival_time
+        for row in self._inbound()[city]:
+            self.transfers[row] = bisect_left(departures, arrival[row] + wait)
+
+    def _index(self, row):
+        """Insert row into its city bucket, the transfer ranges and the connection-scan arrays"""
+        arrivals = self._inbound()
+        self._reach_flight(row)
+        departure, arrival = self.table.departure_time[row], self.table.arrival_time[row]
+        city, end = self.table.start_city[row], self.table.end_city[row]
+        release = arrival + self.connection_times[end]
+        k = bisect_right(self.departures[city], departure)
+        self.cities[city].insert(k, row)
+        self.departures[city].insert(k, departure)
+        self._retarget(city)
+        arrivals[end].append(row)
+        if row == len(self.transfers):
+            self.transfers.append(0)
+        self.transfers[row] = bisect_left(self.departures[end], release)
+        k = bisect_right(self.connection_departures, departure)
+        self.connections.insert(k, row)
+        self.connection_departures.insert(k, departure)
+        k = bisect_right(self.release_times, release)
+        self.releases.insert(k, row)
+        self.release_times.insert(k, release)
+
+    def _reach_flight(self, row):
+        """Keep the reachability index valid for a new or changed flight at row
+
+        A removed flight leaves the index a safe superset, and so does a flight between
+        cities that already reached one another: first_arrival is then lowered in place.
+        Only a flight giving its city a new reachable city drops the index, to be rebuilt
+        on the next query. A new city starts as a component of its own.
+        """
+        if self._reach is None:
+            return
+        component, reach, first_arrival = self._reach
+        while len(component) < self.n:
+            component.append(len(reach))
+            reach.append(1 << len(reach))
+            first_arrival.append(float('inf'))
+        city, end = self.table.start_city[row], self.table.end_city[row]
+        if not reach[component[city]] >> component[end] & 1:
+            self._reach = None
+        elif self.table.arrival_time[row] < first_arrival[end]:
+            first_arrival[end] = self.table.arrival_time[row]
+
+    def _unindex(self, row):
+        """Remove row from its city bucket, the transfer ranges and the connection-scan arrays"""
+        arrivals = self._inbound()
+        departure, arrival = self.table.departure_time[row], self.table.arrival_time[row]
+        city, end = self.table.start_city[row], self.table.end_city[row]
+        for rows, keys, key in ((self.cities[city], self.departures[city], departure),
+                                (self.connections, self.connection_departures, departure),
+                                (self.releases, self.release_times, arrival + self.connection_times[end])):
+            k = bisect_left(keys, key)
+            while rows[k] != row:
+                k += 1
+            del rows[k]
+            del keys[k]
+        arrivals[end].remove(row)
+        self._retarget(city)
+
+    def _query(self, objective, kernel, start_city, end_city, t1, t2, build=None):
+        """The answer to a query: the rows of kernel, from the cache when possible, turned
+        into Flights by build (FlightTable.route by default)
+
+        Rows are cached rather than Flight objects, so callers always get fresh Flights
+        and cannot alter a cached answer.
+        """
+        build = build or self.table.route
+        if self.stats is not None:
+            return self._measured_query(objective, kernel, start_city, end_city, t1, t2, build)
+        if self._unreachable(start_city, end_city, t1, t2):
+            rows = self._no_route(objective)
+        elif self.cache is None:
+            rows = kernel(start_city, end_city, t1, t2)
+        else:
+            key = (objective, start_city, end_city, t1, t2)
+            rows = self.cache.get(key)
+            if rows is None:
+                rows = kernel(start_city, end_city, t1, t2)
+                self.cache.put(key, rows)
+        return build(rows)
+
+    def _routes(self, routes):
+        """build for the queries answering a list of routes"""
+        return [self.table.route(rows) for rows in routes]
+
+    def _no_route(self, objective):
+        return ([], [], []) if objective == "all" else []
+
+    def _phase(self, stats, phase, start):
+        """Add the time since start to a phase of stats and return the current time"""
+        now = time.perf_counter()
+        stats.add_phase(phase, now - start)
+        return now
+
+    def _record(self, stats):
+        """Publish the SearchStats of a finished query or batch"""
+        self.last_stats = stats
+        self.stats += stats
+
+    def _measured_query(self, objective, kernel, start_city, end_city, t1, t2, build):
+        """_query recording its SearchStats in last_stats and stats"""
+        self._stats = stats = self.SearchStats()
+        stats.queries = 1
+        if self._unreachable(start_city, end_city, t1, t2):
+            stats.rejected = 1
+            rows = self._no_route(objective)
+        else:
+            rows = None
+        try:
+            if rows is None and self.cache is not None:
+                start = time.perf_counter()
+                rows = self.cache.get((objective, start_city, end_city, t1, t2))
+                stats.add_phase("cache", time.perf_counter() - start)
+                stats.cache_hits = int(rows is not None)
+            if rows is None:
+                start = time.perf_counter()
+                rows = kernel(start_city, end_city, t1, t2)
+                stats.add_phase("search", time.perf_counter() - start)
+                if self.cache is not None:
+                    self.cache.put((objective, start_city, end_city, t1, t2), rows)
+        finally:
+            self._stats = None
+        start = time.perf_counter()
+        answer = build(rows)
+        stats.add_phase("routes", time.perf_counter() - start)
+        self._record(stats)
+        return answer
+
+    def _scratch(self):
+        """The Workspace for the next search, cleared of the previous one"""
+        ws = self._workspace
+        if ws is not None and isinstance(ws.heap, self.BucketQueue) and ws.heap.width <= self.max_fare:
+            ws = None       # a fare update outgrew Dial's buckets
+        if ws is not None and len(ws.label) < self.m:
+            ws.grow(self.m)
+            return ws
+        if ws is None:
+            if self.queue == "binary":
+                heap = lex_heap = self.IndexedHeap(self.m)
+            elif self.queue == "dial" and self.max_fare <= self.DIAL_MAX_FARE:
+                heap = self.BucketQueue(self.m, self.max_fare)
+                lex_heap = self.RadixHeap(self.m)
+            else:
+                heap = lex_heap = self.RadixHeap(self.m)
+            self._workspace = self.Workspace(self.m, heap, lex_heap)
+        else:
+            ws.reset()
+        return self._workspace
+
+    def _reachability(self):
+        """(component, reach, first_arrival): the static reachability index of the cities
+
+        component[c] is the strongly connected component of city c in the graph with an
+        edge for every flight, numbered by Tarjan's algorithm so that a component only
+        reaches lower numbers; bit d of reach[k] is set when component k reaches component
+        d. first_arrival[c] is the earliest arrival of any flight into c. Rebuilt here when
+        a flight gave some city a new reachable city since the last build.
+        """
+        if self._reach is not None:
+            return self._reach
+        n, end, arrival = self.n, self.table.end_city, self.table.arrival_time
+        successors = [set(map(end.__getitem__, rows)) for rows in self.cities]
+
+        # Iterative Tarjan
+        index, low = [-1] * n, [0] * n
+        on_stack = [False] * n
+        stack = []
+        component = [-1] * n
+        counter = components = 0
+        for root in range(n):
+            if index[root] != -1:
+                continue
+            index[root] = low[root] = counter
+            counter += 1
+            stack.append(root)
+            on_stack[root] = True
+            work = [(root, iter(successors[root]))]
+            while work:
+                city, edges = work[-1]
+                for nxt in edges:
+                    if index[nxt] == -1:
+                        index[nxt] = low[nxt] = counter
+                        counter += 1
+                        stack.append(nxt)
+                        on_stack[nxt] = True
+                        work.append((nxt, iter(successors[nxt])))
+                        break
+                    if on_stack[nxt] and index[nxt] < low[city]:
+                        low[city] = index[nxt]
+                else:
+                    work.pop()
+                    if work and low[city] < low[work[-1][0]]:
+                        low[work[-1][0]] = low[city]
+                    if low[city] == index[city]:
+                        while True:
+                            member = stack.pop()
+                            on_stack[member] = False
+                            component[member] = components
+                            if member == city:
+                                break
+                        components += 1
+
+        # Components come out sinks first, so every successor's bits are ready in time
+        below = [set() for i in range(components)]
+        for city in range(n):
+            for nxt in successors[city]:
+                if component[nxt] != component[city]:
+                    below[component[city]].add(component[nxt])
+        reach = [0] * components
+        for k in range(components):
+            bits = 1 << k
+            for d in below[k]:
+                bits |= reach[d]
+            reach[k] = bits
+
+        inf = float('inf')
+        first_arrival = [inf] * n
+        for rows in self.cities:
+            for row in rows:
+                if arrival[row] < first_arrival[end[row]]:
+                    first_arrival[end[row]] = arrival[row]
+        self._reach = (component, reach, first_arrival)
+        return self._reach
+
+    def _unreachable(self, start_city, end_city, t1, t2):
+        """True when the reachability index proves there is no route, O(1)"""
+        if start_city == end_city:
+            return False
+        if not (0 <= start_city < self.n and 0 <= end_city < self.n):
+            return True
+        component, reach, first_arrival = self._reachability()
+        departures = self.departures[start_city]
+        return (not reach[component[start_city]] >> component[end_city] & 1
+                or first_arrival[end_city] > t2 or not departures or departures[-1] < t1)
+
+    def _inbound_fares(self):
+        """Per city, the cheapest fare of any flight into it from each other city
+
+        This is the static city graph behind the A* bounds, built on first use and lowered
+        in place when a flight is added or gets cheaper.
+        """
+        if self._city_graph is None:
+            end, fare = self.table.end_city, self.table.fare
+            inbound = [{} for i in range(self.n)]
+            for city, rows in enumerate(self.cities):
+                for row in rows:
+                    edges = inbound[end[row]]
+                    if fare[row] < edges.get(city, float('inf')):
+                        edges[city] = fare[row]
+            self._city_graph = inbound
+        return self._city_graph
+
+    def _lower_bounds(self, end_city):
+        """(fares, flights): per city, lower bounds on the fare and the number of flights
+        still needed to reach end_city, inf if it cannot be reached at all
+
+        Times are ignored, so they are found on the static city graph with a reverse
+        Dijkstra and a reverse BFS. The bounds of the last BOUNDS_CACHED destinations are kept.
+        """
+        bounds = self._cached_bounds(end_city)
+        if bounds is None:
+            bounds = self._keep_bounds(end_city, self._compute_bounds(end_city))
+        return bounds
+
+    def _cached_bounds(self, end_city):
+        bounds = self._bounds.get(end_city)
+        if bounds is not None:
+            self._bounds.move_to_end(end_city)
+        return bounds
+
+    def _keep_bounds(self, end_city, bounds):
+        """Cache the bounds of end_city, or return the ones already cached for it"""
+        kept = self._bounds.setdefault(end_city, bounds)
+        if len(self._bounds) > self.BOUNDS_CACHED:
+            self._bounds.popitem(last=False)
+        return kept
+
+    def _compute_bounds(self, end_city):
+        inbound = self._inbound_fares()
+        inf = float('inf')
+        fares, hops = [inf] * self.n, [inf] * self.n
+        if end_city < self.n:
+            hops[end_city] = 0
+            frontier = [end_city]
+            while frontier:
+                next_frontier = []
+                for city in frontier:
+                    for prev in inbound[city]:
+                        if hops[prev] == inf:
+                            hops[prev] = hops[city] + 1
+                            next_frontier.append(prev)
+                frontier = next_frontier
+
+            fares[end_city] = 0
+            pq = self.IndexedHeap(self.n)
+            pq.push(end_city, 0)
+            while pq:
+                city, fare = pq.pop()
+                for prev, edge in inbound[city].items():
+                    if fare + edge < fares[prev]:
+                        fares[prev] = fare + edge
+                        pq.push(prev, fares[prev])
+        return fares, hops
+
+    def _onward(self, city, earliest, t2):
+        """Rows of the flights out of city departing in [earliest, t2], by departure"""
+        departures = self.departures[city]
+        return self.cities[city][bisect_left(departures, earliest):bisect_right(departures, t2)]
+
+    def _transfers(self, flight, t2):
+        """Rows of the flights that can follow flight and depart by t2, by departure"""
+        city = self.table.end_city[flight]
+        start = self.transfers[flight]
+        return self.cities[city][start:bisect_right(self.departures[city], t2, start)]
+
+    def _start_candidates(self, start_city, t1, t2):
+        arrival = self.table.arrival_time
+        return [i for i in self._onward(start_city, t1, t2) if arrival[i] <= t2]
     
     def least_flights_earliest_route(self, start_city, end_city, t1, t2):
         """
@@ -114,75 +1066,300 @@ class Planner:
         The route has the least number of flights, and within routes with same number of flights, 
         arrives the earliest
         """
-        least_flights = []
+        kernel = self._csa_least_flights_earliest if self.backend == "csa" else self._bfs_least_flights_earliest
+        return self._query("least_flights_earliest", kernel, start_city, end_city, t1, t2)
+
+    def _bfs_least_flights_earliest(self, start_city, end_city, t1, t2):
+        """BFS for least_flights_earliest_route, one search per start candidate"""
         if start_city == end_city: return []
-        for city in self.cities:
-            city.sort(key=lambda x: x.arrival_time)
-        start_flight_candidates = [i for i in self.cities[start_city] if (i.departure_time >= t1 and i.arrival_time <= t2)]
-        
+        end, arrival = self.table.end_city, self.table.arrival_time
+        ws = self._scratch()
+        hops, pred, touched, q = ws.hops, ws.pred, ws.touched, ws.queue
         min_time = float("inf")
         min_flights = float("inf")
-        for i in start_flight_candidates:
-            visited = [False] * (self.m + 1)
-            q = self.Queue(self.m)
-            curr_flight = None
-            q.push((self.Flights_modified(i, None), 1))
+        best = []
+        candidates = self._start_candidates(start_city, t1, t2)
+        component, reach = self._reachability()[:2]
+        target = component[end_city]
+        track = self._stats is not None
+        pops = relaxations = max_queue = 0
+        for i in candidates:
+            ws.reset()
+            hops[i] = 1
+            touched.append(i)
+            q.push(i)
+            found = float("inf")
             while q.size > 0:
-                flight, depth = q.pop()
-                visited[flight.flight_no] = True
-                if flight.end_city == end_city:
-                    if min_flights > depth or (min_flights == depth and flight.arrival_time < min_time):
-                        curr_flight = flight
-                        min_time = flight.arrival_time
-                        min_flights = depth
+                if track and q.size > max_queue:
+                    max_queue = q.size
+                flight = q.pop()
+                pops += 1
+                if hops[flight] > found:
                     break
-                for j in self.cities[flight.end_city]:
-                    if not visited[j.flight_no] and j.arrival_time <= t2 and j.departure_time >= flight.arrival_time + 20:
-                        visited[j.flight_no] = True
-                        q.push((self.Flights_modified(j, flight), depth + 1))
-            if curr_flight is not None:
-                least_flights = []
-                while curr_flight is not None:
-                    least_flights.append(curr_flight.flight)
-                    curr_flight = curr_flight.previous
-        return least_flights[::-1]
+                if end[flight] == end_city:
+                    # Keep draining this depth, a later flight at the same depth may arrive earlier
+                    found = hops[flight]
+                    if min_flights > hops[flight] or (min_flights == hops[flight] and arrival[flight] < min_time):
+                        best = ws.chain(flight)
+                        min_time = arrival[flight]
+                        min_flights = hops[flight]
+                    continue
+                if found != float("inf"):
+                    continue
+                city = component[end[flight]]
+                if city != target and not reach[city] >> target & 1:
+                    continue
+                onward = self._transfers(flight, t2)
+                relaxations += len(onward)
+                for j in onward:
+                    if hops[j] == float("inf") and arrival[j] <= t2:
+                        hops[j] = hops[flight] + 1
+                        pred[j] = flight
+                        touched.append(j)
+                        q.push(j)
+        if track:
+            self._stats.count(len(candidates), pops, relaxations, max_queue)
+        return best
         
-    def cheapest_route(self, start_city, end_city, t1, t2):
+    def _csa_least_flights_earliest(self, start_city, end_city, t1, t2):
+        """Connection Scan for least_flights_earliest_route
+
+        Scans the flights departing in [t1, t2] once, in departure order. A flight is
+        labelled with the fewest flights needed to board it; a labelled flight is
+        released into its end city once its connection time has passed, which is
+        always before any flight it can connect to is scanned.
+        """
+        if start_city == end_city:
+            return []
+        start, end, arrival = self.table.start_city, self.table.end_city, self.table.arrival_time
+        ws = self._scratch()
+        hops, pred, touched = ws.hops, ws.pred, ws.touched
+        best_hops = [float('inf')] * self.n     # per city, over released flights
+        best_flight = [-1] * self.n
+        min_flights = float('inf')
+        min_time = float('inf')
+        curr_flight = -1
+        candidates = 0
+        component, reach = self._reachability()[:2]
+        target = component[end_city]
+
+        r = bisect_left(self.release_times, t1)
+        scan = range(bisect_left(self.connection_departures, t1), bisect_right(self.connection_departures, t2))
+        for k in scan:
+            flight = self.connections[k]
+            while r < len(self.releases) and self.release_times[r] <= self.connection_departures[k]:
+                released = self.releases[r]
+                r += 1
+                if hops[released] < best_hops[end[released]]:
+                    best_hops[end[released]] = hops[released]
+                    best_flight[end[released]] = released
+            if arrival[flight] > t2 or start[flight] == end_city:
+                continue
+            if start[flight] == start_city:
+                depth, prev = 1, -1
+                candidates += 1
+            elif best_flight[start[flight]] != -1:
+                depth, prev = best_hops[start[flight]] + 1, best_flight[start[flight]]
+            else:
+                continue
+            if depth > min_flights:
+                continue
+            if end[flight] == end_city:
+                if depth < min_flights or arrival[flight] < min_time:
+                    curr_flight = flight
+                    min_flights = depth
+                    min_time = arrival[flight]
+                pred[flight] = prev
+                touched.append(flight)
+            elif depth < min_flights and (component[end[flight]] == target
+                                          or reach[component[end[flight]]] >> target & 1):
+                hops[flight] = depth
+                pred[flight] = prev
+                touched.append(flight)
+        if self._stats is not None:
+            self._stats.count(candidates, len(scan), len(touched), 0)
+        if curr_flight == -1:
+            return []
+        return ws.chain(curr_flight)
+
+    def cheapest_route(self, start_city, end_city, t1, t2, max_flights=None):
         """
         Return List[Flight]: A route from start_city to end_city, which departs after t1 (>= t1) and
-        arrives before t2 (<=) satisfying: 
-        The route is a cheapest route
+        arrives before t2 (<=) satisfying:
+        The route is a cheapest route (among the routes of at most max_flights flights, when given)
+        """
+        if max_flights is not None:
+            if not isinstance(max_flights, int) or max_flights < 0:
+                raise ValueError("max_flights must be a non-negative integer")
+            kernel = lambda start_city, end_city, t1, t2: self._bounded_cheapest(start_city, end_city, t1, t2, max_flights)
+            return self._query(("cheapest", max_flights), kernel, start_city, end_city, t1, t2)
+        kernel = self._astar_cheapest if self.astar else self._cheapest
+        return self._query("cheapest", kernel, start_city, end_city, t1, t2)
+
+    def _cheapest(self, start_city, end_city, t1, t2):
+        if start_city == end_city:
+            return []
+        end, arrival, fare_of = self.table.end_city, self.table.arrival_time, self.table.fare
+        ws = self._scratch()
+        fares, pred, touched, pq = ws.label, ws.pred, ws.touched, ws.heap
+        # Every valid first flight is seeded into one queue, so a single search
+        # covers all departures out of start_city instead of one per departure
+        candidates = self._start_candidates(start_city, t1, t2)
+        for i in candidates:
+            fares[i] = fare_of[i]
+            touched.append(i)
+            pq.push(i, fare_of[i])
+        component, reach = self._reachability()[:2]
+        target = component[end_city]
+        track = self._stats is not None
+        pops = relaxations = max_queue = 0
+        found = -1
+        while pq:
+            if track and len(pq) > max_queue:
+                max_queue = len(pq)
+            flight, fare = pq.pop()
+            pops += 1
+            if end[flight] == end_city:
+                found = flight
+                break
+            # Flights into cities that cannot reach end_city are not extended
+            city = component[end[flight]]
+            if city != target and not reach[city] >> target & 1:
+                continue
+            onward = self._transfers(flight, t2)
+            relaxations += len(onward)
+            for j in onward:
+                if fare + fare_of[j] < fares[j] and arrival[j] <= t2:
+                    if fares[j] == float('inf'):
+                        touched.append(j)
+                    fares[j] = fare + fare_of[j]
+                    pred[j] = flight
+                    pq.push(j, fares[j])
+        if track:
+            self._stats.count(len(candidates), pops, relaxations, max_queue)
+        return [] if found == -1 else ws.chain(found)
+
+    def _astar_cheapest(self, start_city, end_city, t1, t2):
+        """A* variant of _cheapest, guided by the fare lower bounds of _lower_bounds
+
+        A flight is queued by its fare plus the bound from its arrival city. The bound
+        never exceeds the fare of the next flight plus the bound after it, so keys never
+        decrease and the first flight popped into end_city closes a cheapest route.
+        Flights into cities that cannot reach end_city are never queued.
         """
-        cheapest_route = []
         if start_city == end_city:
             return []
-        min_fare = float('inf')
-        
-        start_flight_candidates = [i for i in self.cities[start_city] if (i.departure_time >= t1 and i.arrival_time <= t2)]
-        for i in start_flight_candidates:
-            fares = [float('inf')] * (self.m + 1)
-            curr_flight = None
-            pq = self.Heap(self.comparison, [])
-            pq.insert((i.fare, self.Flights_modified(i, None)))
-            while pq.top() is not None:
-                fare, flight = pq.extract()
-                if flight.end_city == end_city:
-                    if fare < min_fare:
-                        curr_flight = flight
-                        min_fare = fare
-                    break
-                for j in self.cities[flight.end_city]:
-                    if fare + j.fare < fares[j.flight_no] and j.arrival_time <= t2 and j.departure_time >= flight.arrival_time + 20:
-                        fares[j.flight_no] = fare + j.fare
-                        pq.insert((fares[j.flight_no], self.Flights_modified(j, flight)))            
-            if curr_flight is not None:
-                cheapest_route=[]
-                while curr_flight is not None:
-                    cheapest_route.append(curr_flight.flight)
-                    curr_flight = curr_flight.previous
-            
-        return cheapest_route[::-1]
-        
+        end, arrival, fare_of = self.table.end_city, self.table.arrival_time, self.table.fare
+        remaining = self._lower_bounds(end_city)[0]
+        inf = float('inf')
+        ws = self._scratch()
+        # Keys jump by more than one fare, which Dial's buckets cannot hold
+        fares, pred, touched, pq = ws.label, ws.pred, ws.touched, ws.lex_heap
+        candidates = self._start_candidates(start_city, t1, t2)
+        for i in candidates:
+            if remaining[end[i]] != inf:
+                fares[i] = fare_of[i]
+                touched.append(i)
+                pq.push(i, fare_of[i] + remaining[end[i]])
+        track = self._stats is not None
+        pops = relaxations = max_queue = 0
+        found = -1
+        while pq:
+            if track and len(pq) > max_queue:
+                max_queue = len(pq)
+            flight, key = pq.pop()
+            pops += 1
+            if end[flight] == end_city:
+                found = flight
+                break
+            fare = fares[flight]
+            onward = self._transfers(flight, t2)
+            relaxations += len(onward)
+            for j in onward:
+                if fare + fare_of[j] < fares[j] and arrival[j] <= t2 and remaining[end[j]] != inf:
+                    if fares[j] == inf:
+                        touched.append(j)
+                    fares[j] = fare + fare_of[j]
+                    pred[j] = flight
+                    pq.push(j, fares[j] + remaining[end[j]])
+        if track:
+            self._stats.count(len(candidates), pops, relaxations, max_queue)
+        return [] if found == -1 else ws.chain(found)
+
+    def _bounded_cheapest(self, start_city, end_city, t1, t2, max_flights):
+        """Round-based search for cheapest_route with max_flights
+
+        Round k relaxes, from the flights whose cheapest fare improved in round k - 1, their
+        transfer ranges; a flight is marked for the next round only when it gets cheaper than
+        any route with fewer flights to it. A flight is not extended when the flights bound of
+        _lower_bounds says end_city is more than the remaining rounds away, or when its fare
+        plus the fare bound cannot beat the best route found, so a small max_flights stops
+        early. Each round keeps the (fare, previous row) of its marked flights: a later round
+        may make a predecessor cheaper with more flights, so pred chains alone could exceed
+        max_flights.
+        """
+        if start_city == end_city or max_flights == 0:
+            return []
+        end, arrival, fare_of = self.table.end_city, self.table.arrival_time, self.table.fare
+        remaining_fare, remaining_hops = self._lower_bounds(end_city)
+        inf = float('inf')
+        ws = self._scratch()
+        best_fare, next_fare, next_pred, touched = ws.label, ws.next_label, ws.next_pred, ws.touched
+        candidates = self._start_candidates(start_city, t1, t2)
+        marked = []
+        for i in candidates:
+            if remaining_hops[end[i]] < max_flights:
+                best_fare[i] = fare_of[i]
+                touched.append(i)
+                marked.append(i)
+        rounds = [{i: (best_fare[i], -1) for i in marked}]
+        found, found_round, found_fare = -1, 0, inf
+        pops = relaxations = max_queue = 0
+
+        k = 1
+        while marked:
+            pops += len(marked)
+            max_queue = max(max_queue, len(marked))
+            next_marked = []
+            for flight in marked:
+                fare, city = best_fare[flight], end[flight]
+                if city == end_city:
+                    if fare < found_fare:
+                        found, found_round, found_fare = flight, k, fare
+                    continue
+                # Routes that need more rounds than are left, or cannot get cheaper than
+                # the best one found, are not extended
+                if k + remaining_hops[city] > max_flights or fare + remaining_fare[city] >= found_fare:
+                    continue
+                onward = self._transfers(flight, t2)
+                relaxations += len(onward)
+                for j in onward:
+                    new_fare = fare + fare_of[j]
+                    if new_fare < best_fare[j] and new_fare < next_fare[j] and arrival[j] <= t2:
+                        if next_fare[j] == inf:
+                            next_marked.append(j)
+                            touched.append(j)
+                        next_fare[j] = new_fare
+                        next_pred[j] = flight
+            marked = []
+            labels = {}
+            for j in next_marked:
+                fare, next_fare[j] = next_fare[j], inf
+                if fare < best_fare[j] and fare + remaining_fare[end[j]] < found_fare:
+                    best_fare[j] = fare
+                    labels[j] = (fare, next_pred[j])
+                    marked.append(j)
+            rounds.append(labels)
+            k += 1
+        if self._stats is not None:
+            self._stats.count(len(candidates), pops, relaxations, max_queue)
+        rows = []
+        while found != -1:
+            rows.append(found)
+            found_round -= 1
+            found = rounds[found_round][found][1]
+        return rows[::-1]
+
     def least_flights_cheapest_route(self, start_city, end_city, t1, t2):
         """
         Return List[Flight]: A route from start_city to end_city, which departs after t1 (>= t1) and
@@ -190,33 +1367,622 @@ class Planner:
         The route has the least number of flights, and within routes with same number of flights, 
         is the cheapest
         """        
-        least_cheapest_route = []
+        kernel = self._astar_least_flights_cheapest if self.astar else self._least_flights_cheapest
+        return self._query("least_flights_cheapest", kernel, start_city, end_city, t1, t2)
+
+    def _least_flights_cheapest(self, start_city, end_city, t1, t2):
         if start_city == end_city:
             return []
+        end, arrival, fare_of = self.table.end_city, self.table.arrival_time, self.table.fare
+        ws = self._scratch()
+        fares, hops, pred, touched, pq = ws.label, ws.hops, ws.pred, ws.touched, ws.lex_heap
+        hop_weight = self.hop_weight
         min_depth = float('inf')
         min_fare = float('inf')
-        start_flight_candidates = [i for i in self.cities[start_city] if (i.departure_time >= t1 and i.arrival_time <= t2)]
-        for i in start_flight_candidates:
-            fares = [(float("inf"),float('inf'))] * (self.m + 1)
-            curr_flight = None
-            pq = self.Heap(self.comparison2, [])
-            pq.insert((1, i.fare, self.Flights_modified(i, None)))
-            while pq.top() is not None:
-                depth, fare, flight = pq.extract()
-                if flight.end_city == end_city:
+        best = []
+        candidates = self._start_candidates(start_city, t1, t2)
+        component, reach = self._reachability()[:2]
+        target = component[end_city]
+        track = self._stats is not None
+        pops = relaxations = max_queue = 0
+        for i in candidates:
+            ws.reset()
+            hops[i], fares[i] = 1, fare_of[i]
+            touched.append(i)
+            pq.push(i, hop_weight + fare_of[i])
+            while pq:
+                if track and len(pq) > max_queue:
+                    max_queue = len(pq)
+                flight, key = pq.pop()
+                pops += 1
+                depth, fare = divmod(key, hop_weight)
+                if end[flight] == end_city:
                     if depth < min_depth or (depth == min_depth and fare < min_fare):
-                        curr_flight = flight
+                        best = ws.chain(flight)
                         min_fare = fare
                         min_depth = depth
                     break
-                for j in self.cities[flight.end_city]:
-                    if ((depth + 1 , fare + j.fare) < fares[j.flight_no]) and j.arrival_time <= t2 and j.departure_time >= flight.arrival_time + 20:
-                        fares[j.flight_no] = (depth + 1 , fare + j.fare)
-                        pq.insert((depth + 1, fares[j.flight_no][1], self.Flights_modified(j, flight)))            
-            if curr_flight is not None:
-                least_cheapest_route=[]
-                while curr_flight is not None:
-                    least_cheapest_route.append(curr_flight.flight)
-                    curr_flight=curr_flight.previous
-
-        return least_cheapest_route[::-1]
\ No newline at end of file
+                city = component[end[flight]]
+                if city != target and not reach[city] >> target & 1:
+                    continue
+                onward = self._transfers(flight, t2)
+                relaxations += len(onward)
+                for j in onward:
+                    if (depth + 1, fare + fare_of[j]) < (hops[j], fares[j]) and arrival[j] <= t2:
+                        if hops[j] == float('inf'):
+                            touched.append(j)
+                        hops[j], fares[j] = depth + 1, fare + fare_of[j]
+                        pred[j] = flight
+                        pq.push(j, (depth + 1) * hop_weight + fares[j])
+        if track:
+            self._stats.count(len(candidates), pops, relaxations, max_queue)
+        return best
+
+    def _astar_least_flights_cheapest(self, start_city, end_city, t1, t2):
+        """A* variant of _least_flights_cheapest
+
+        Keys add the flights and fare lower bounds of _lower_bounds to the (flights, fare)
+        of a route. Along a connection the flights bound drops by at most one and the fare
+        bound by at most the fare, so keys never decrease lexicographically: a start
+        candidate is skipped, and its search stopped, once its keys reach the best route
+        found so far.
+        """
+        if start_city == end_city:
+            return []
+        end, arrival, fare_of = self.table.end_city, self.table.arrival_time, self.table.fare
+        remaining_fare, remaining_hops = self._lower_bounds(end_city)
+        inf = float('inf')
+        ws = self._scratch()
+        fares, hops, pred, touched, pq = ws.label, ws.hops, ws.pred, ws.touched, ws.lex_heap
+        # A fare plus its bound stays below twice the sum of all fares
+        weight = 2 * self.hop_weight
+        best_key = inf
+        best = []
+        candidates = self._start_candidates(start_city, t1, t2)
+        track = self._stats is not None
+        pops = relaxations = max_queue = 0
+        for i in candidates:
+            city = end[i]
+            if remaining_hops[city] == inf:
+                continue
+            key = (1 + remaining_hops[city]) * weight + fare_of[i] + remaining_fare[city]
+            if key >= best_key:
+                continue
+            ws.reset()
+            hops[i], fares[i] = 1, fare_of[i]
+            touched.append(i)
+            pq.push(i, key)
+            while pq:
+                if track and len(pq) > max_queue:
+                    max_queue = len(pq)
+                flight, key = pq.pop()
+                pops += 1
+                if key >= best_key:
+                    break
+                if end[flight] == end_city:
+                    best = ws.chain(flight)
+                    best_key = key
+                    break
+                depth, fare = hops[flight] + 1, fares[flight]
+                onward = self._transfers(flight, t2)
+                relaxations += len(onward)
+                for j in onward:
+                    city = end[j]
+                    if (depth, fare + fare_of[j]) < (hops[j], fares[j]) and arrival[j] <= t2 \
+                            and remaining_hops[city] != inf:
+                        if hops[j] == inf:
+                            touched.append(j)
+                        hops[j], fares[j] = depth, fare + fare_of[j]
+                        pred[j] = flight
+                        pq.push(j, (depth + remaining_hops[city]) * weight + fares[j] + remaining_fare[city])
+        if track:
+            self._stats.count(len(candidates), pops, relaxations, max_queue)
+        return best
+
+    def k_cheapest_routes(self, start_city, end_city, t1, t2, k):
+        """
+        Return List[List[Flight]]: The k cheapest routes from start_city to end_city, which depart
+        after t1 (>= t1) and arrive before t2 (<=), by increasing fare (fewer if there are not k
+        such routes). Routes with equal fares come in no particular order.
+        """
+        if not isinstance(k, int) or k < 0:
+            raise ValueError("k must be a non-negative integer")
+        if k == 0:
+            return []
+        kernel = lambda start_city, end_city, t1, t2: self._k_cheapest(start_city, end_city, t1, t2, k)
+        return self._query(("k_cheapest", k), kernel, start_city, end_city, t1, t2, self._routes)
+
+    def _scan_backward(self, start_city, end_city, t1, t2, visit):
+        """Visit the flights of the window by decreasing departure, for the backward scans of
+        _cost_to_go and _profile, and return the number of visits
+
+        Only flights between cities on some route from start_city to end_city are visited,
+        and none out of end_city. visit(flight) returns True when it changed what the flight
+        offers to the flights scanned after it. Flights leaving at the same time can only
+        follow one another with a zero flight and connection time; such a group is then
+        visited again until nothing changes.
+        """
+        start, end, arrival = self.table.start_city, self.table.end_city, self.table.arrival_time
+        departure_of, wait = self.table.departure_time, self.connection_times
+        connections, departures = self.connections, self.connection_departures
+        component, reach = self._reachability()[:2]
+        source, target = reach[component[start_city]], component[end_city]
+        on_route = [source >> component[c] & 1 and reach[component[c]] >> target & 1 for c in range(self.n)]
+        scan = [f for f in connections[bisect_left(departures, t1):bisect_right(departures, t2)]
+                if arrival[f] <= t2 and on_route[start[f]] and on_route[end[f]] and start[f] != end_city]
+        visits = 0
+        k = len(scan)
+        while k > 0:
+            departure = departure_of[scan[k - 1]]
+            first = k - 1
+            while first > 0 and departure_of[scan[first - 1]] == departure:
+                first -= 1
+            group = scan[first:k]
+            k = first
+            chained = any(arrival[f] + wait[end[f]] <= departure for f in group)
+            changed = True
+            while changed:
+                changed = False
+                for f in group:
+                    visits += 1
+                    if visit(f) and chained:
+                        changed = True
+        return visits
+
+    def _cost_to_go(self, start_city, end_city, t1, t2):
+        """Per row in the window, the fare of the cheapest way to finish a route to end_city by
+        taking that flight, inf if there is none (rows missing from the dict)
+
+        best_keys[c] holds the negated departure times of the flights out of c scanned so far
+        by _scan_backward, and best[c] the lowest cost to go of the flights leaving at or after
+        each of them, so a flight into c finds the cheapest continuation it can catch with one
+        bisect.
+        """
+        start, end, arrival = self.table.start_city, self.table.end_city, self.table.arrival_time
+        fare_of, departure_of, wait = self.table.fare, self.table.departure_time, self.connection_times
+        inf = float('inf')
+        cost = {}
+        best_keys = [[] for i in range(self.n)]
+        best = [[] for i in range(self.n)]
+
+        def visit(f):
+            city = end[f]
+            if city == end_city:
+                value = fare_of[f]
+            else:
+                i = bisect_right(best_keys[city], -(arrival[f] + wait[city])) - 1
+                if i < 0 or best[city][i] == inf:
+                    return False
+                value = fare_of[f] + best[city][i]
+            if value >= cost.get(f, inf):
+                return False
+            cost[f] = value
+            keys, lowest = best_keys[start[f]], best[start[f]]
+            if keys and keys[-1] == -departure_of[f]:
+                lowest[-1] = min(lowest[-1], value)
+            else:
+                keys.append(-departure_of[f])
+                lowest.append(min(value, lowest[-1]) if lowest else value)
+            return True
+
+        self._scan_backward(start_city, end_city, t1, t2, visit)
+        return cost
+
+    def _k_cheapest(self, start_city, end_city, t1, t2, k):
+        """Best-first enumeration of routes behind k_cheapest_routes
+
+        A partial route is queued by its fare plus the exact cost to go of its last flight
+        (_cost_to_go), so partial routes come out in the order of the cheapest complete
+        route extending them and every complete route popped is the next cheapest one. A
+        pop settles a route or extends one by a flight, and only flights that can still
+        reach end_city are queued, so the work grows linearly in k. Partial routes share
+        their prefixes as (row, previous) links. A route never takes the same flight twice,
+        which zero flight and connection times would otherwise allow; the cost to go may
+        then be too low, which keeps the order right but can queue dead ends.
+        """
+        if start_city == end_city:
+            return []
+        end, arrival, fare_of = self.table.end_city, self.table.arrival_time, self.table.fare
+        departure_of = self.table.departure_time
+        cost = self._cost_to_go(start_city, end_city, t1, t2)
+        candidates = [f for f in self._start_candidates(start_city, t1, t2) if f in cost]
+        # (key, sequence number, fare so far, route) entries; the sequence number breaks ties
+        pq = [(cost[f], i, fare_of[f], (f, None)) for i, f in enumerate(candidates)]
+        heapq.heapify(pq)
+        pushed = len(candidates)
+        routes = []
+        pops = relaxations = max_queue = 0
+        while pq and len(routes) < k:
+            max_queue = max(max_queue, len(pq))
+            key, seq, fare, route = heapq.heappop(pq)
+            pops += 1
+            flight = route[0]
+            if end[flight] == end_city:
+                rows = []
+                while route is not None:
+                    rows.append(route[0])
+                    route = route[1]
+                routes.append(rows[::-1])
+                continue
+            onward = self._transfers(flight, t2)
+            relaxations += len(onward)
+            for j in onward:
+                # Only a flight leaving as early as this one lands, with a zero connection
+                # time, can already be on the route
+                if j in cost and not (departure_of[j] <= arrival[flight] and self._on_route(route, j)):
+                    heapq.heappush(pq, (fare + cost[j], pushed, fare + fare_of[j], (j, route)))
+                    pushed += 1
+        if self._stats is not None:
+            self._stats.count(len(candidates), pops, relaxations, max_queue)
+        return routes
+
+    @staticmethod
+    def _on_route(route, row):
+        """True when row is one of the flights of a (row, previous) linked route"""
+        while route is not None:
+            if route[0] == row:
+                return True
+            route = route[1]
+        return False
+
+    def earliest_route_within_budget(self, start_city, end_city, t1, t2, budget):
+        """
+        Return List[Flight]: A route from start_city to end_city, which departs after t1 (>= t1) and
+        arrives before t2 (<=) satisfying:
+        The route costs at most budget in total and arrives the earliest, and within routes
+        arriving at the same time, has the least number of flights, then is the cheapest
+        """
+        kernel = lambda start_city, end_city, t1, t2: self._earliest_within_budget(start_city, end_city, t1, t2, budget)
+        return self._query(("budget", budget), kernel, start_city, end_city, t1, t2)
+
+    def _earliest_within_budget(self, start_city, end_city, t1, t2, budget):
+        """Connection Scan with (flights, fare) labels for earliest_route_within_budget
+
+        Every route ending with a flight arrives when the flight does, so a flight only keeps
+        the labels of its routes that are Pareto optimal in (flights, fare). A labelled flight
+        is released into its end city's bag once its connection time has passed; a bag keeps
+        the Pareto front of the labels released into it, and a flight out of the city extends
+        every label of the bag. Labels that cannot stay within budget (by the fare bounds of
+        _lower_bounds) are dropped, and the scan stops once flights depart after the best
+        arrival found. Labels are (flights, fare, row, previous label) tuples. In SearchStats,
+        relaxations counts the labels created and max_queue is the largest label set or bag.
+        """
+        if start_city == end_city:
+            return []
+        start, end, arrival, fare_of = self.table.start_city, self.table.end_city, self.table.arrival_time, self.table.fare
+        remaining = self._lower_bounds(end_city)[0]
+        labels = {}
+        bags = [[] for i in range(self.n)]
+        best = None
+        candidates = pops = created = largest = 0
+
+        r = bisect_left(self.release_times, t1)
+        scan = range(bisect_left(self.connection_departures, t1), bisect_right(self.connection_departures, t2))
+        for k in scan:
+            flight = self.connections[k]
+            departure = self.connection_departures[k]
+            if best is not None and departure > best[0]:
+                break
+            while r < len(self.releases) and self.release_times[r] <= departure:
+                released = self.releases[r]
+                r += 1
+                for label in labels.pop(released, ()):
+                    self._add_label(bags[end[released]], label)
+            pops += 1
+            city = end[flight]
+            if arrival[flight] > t2 or start[flight] == end_city or (best is not None and arrival[flight] > best[0]):
+                continue
+            # Fares are non-negative, so the direct label dominates any route coming back
+            # to start_city
+            fare, bound = fare_of[flight], budget - remaining[city]
+            if start[flight] == start_city:
+                candidates += 1
+                found = [(1, fare, flight, None)] if fare <= bound else []
+            else:
+                found = [(label[0] + 1, label[1] + fare, flight, label) for label in bags[start[flight]]
+                         if label[1] + fare <= bound]
+            if not found:
+                continue
+            created += len(found)
+            largest = max(largest, len(found))
+            if city == end_city:
+                # The first label has the fewest flights
+                label = found[0]
+                if best is None or (arrival[flight], label[0], label[1]) < best[:3]:
+                    best = (arrival[flight], label[0], label[1], label)
+            else:
+                labels[flight] = found
+        if self._stats is not None:
+            self._stats.count(candidates, pops, created, max(largest, max(map(len, bags), default=0)))
+        rows = []
+        label = best[3] if best is not None else None
+        while label is not None:
+            rows.append(label[2])
+            label = label[3]
+        return rows[::-1]
+
+    @staticmethod
+    def _add_label(front, label):
+        """Add label to front (by flights, with strictly decreasing fares) unless one with no
+        more flights and no higher fare is there, dropping the labels it dominates"""
+        flights, fare = label[0], label[1]
+        i = 0
+        while i < len(front) and front[i][0] <= flights:
+            if front[i][1] <= fare:
+                return False
+            if front[i][0] == flights:
+                break
+            i += 1
+        j = i
+        while j < len(front) and front[j][1] >= fare:
+            j += 1
+        front[i:j] = [label]
+        return True
+
+    def profile_routes(self, start_city, end_city, t1, t2):
+        """
+        Return List[List[Flight]]: Every route from start_city to end_city, which departs after t1
+        (>= t1) and arrives before t2 (<=), that is Pareto optimal in (departure, arrival, number
+        of flights): no other route departs later, arrives earlier or takes fewer flights
+        without being worse in another of them. Routes are sorted by departure time.
+
+        The whole window is answered by one backward scan over its flights, instead of one
+        least_flights_earliest_route call per departure time.
+        """
+        return self._query("profile", self._profile, start_city, end_city, t1, t2, self._routes)
+
+    def _profile(self, start_city, end_city, t1, t2):
+        """Profile Connection Scan behind profile_routes
+
+        Flights are scanned by _scan_backward. journeys[f] is the Pareto front of the
+        routes starting with flight f as (arrival, flights, next flight) tuples, by number of
+        flights with strictly decreasing arrivals. fronts[c] holds, for decreasing departure
+        times, the front of every route leaving city c at or after that time, so a flight into
+        c finds its continuations with one bisect on front_keys[c] (the negated departures).
+        """
+        if start_city == end_city:
+            return []
+        start, end, arrival = self.table.start_city, self.table.end_city, self.table.arrival_time
+        departure_of, wait = self.table.departure_time, self.connection_times
+        journeys = {}
+        front_keys = [[] for i in range(self.n)]
+        fronts = [[] for i in range(self.n)]
+        relaxations = 0
+
+        def visit(f):
+            nonlocal relaxations
+            city = end[f]
+            if city == end_city:
+                front = [(arrival[f], 1, -1)]
+            else:
+                relaxations += 1
+                i = bisect_right(front_keys[city], -(arrival[f] + wait[city])) - 1
+                if i < 0:
+                    return False
+                front = [(a, h + 1, g) for a, h, g in fronts[city][i]]
+            if journeys.get(f) == front:
+                return False
+            journeys[f] = front
+            keys, city_fronts = front_keys[start[f]], fronts[start[f]]
+            old = city_fronts[-1] if city_fronts else []
+            merged = self._pareto_front(old + [(a, h, f) for a, h, g in front])
+            if merged != old:
+                if keys and keys[-1] == -departure_of[f]:
+                    city_fronts[-1] = merged
+                else:
+                    keys.append(-departure_of[f])
+                    city_fronts.append(merged)
+            return True
+
+        pops = self._scan_backward(start_city, end_city, t1, t2, visit)
+
+        # Routes of the start city, later departures first; a route is kept unless one
+        # leaving no earlier has no more flights and arrives no later
+        candidates = self._start_candidates(start_city, t1, t2)
+        found = sorted(((self.table.departure_time[f], h, a, f) for f in candidates for a, h, g in journeys.get(f, ())),
+                       key=lambda route: (-route[0], route[1], route[2]))
+        best = {}
+        routes = []
+        for departure, h, a, f in found:
+            if any(hops <= h and arrival_time <= a for hops, arrival_time in best.items()):
+                continue
+            best[h] = a
+            rows = [f]
+            while h > 1:
+                f = next(g for a, hops, g in journeys[f] if hops == h)
+                rows.append(f)
+                h -= 1
+            routes.append(rows)
+        if self._stats is not None:
+            self._stats.count(len(candidates), pops, relaxations, 0)
+        return routes[::-1]
+
+    @staticmethod
+    def _pareto_front(entries):
+        """Entries (arrival, flights, row) not beaten by one with no more flights and no later arrival"""
+        front = []
+        for entry in sorted(entries, key=lambda entry: (entry[1], entry[0])):
+            if not front or entry[0] < front[-1][0]:
+                front.append(entry)
+        return front
+
+    def plan_all(self, start_city, end_city, t1, t2):
+        """
+        Return Tuple[List[Flight], List[Flight], List[Flight]]: The answers of
+        least_flights_earliest_route, cheapest_route and least_flights_cheapest_route for the
+        same query, computed by one round-based (RAPTOR style) search.
+
+        Round k holds, for every flight reachable with exactly k flights, the cheapest fare of
+        such a route. The first round that reaches end_city decides the least-flights answers;
+        rounds continue while some flight gets cheaper, which decides the cheapest answer.
+        """
+        build = lambda routes: tuple(self._routes(routes))
+        return self._query("all", self._plan_all, start_city, end_city, t1, t2, build)
+
+    def _plan_all(self, start_city, end_city, t1, t2):
+        if start_city == end_city:
+            return [], [], []
+        return self._raptor_routes(self._raptor(start_city, t1, t2, end_city), end_city)
+
+    def _raptor(self, start_city, t1, t2, end_city=None):
+        """Round-based search behind plan_all and batch_query
+
+        With end_city, flights into it are not extended and routes that can no longer beat
+        its best fare are dropped; without it every city is a destination. Returns, per
+        city, the last rows of its least flights earliest, cheapest and least flights
+        cheapest routes (-1 if unreachable). Read them with _raptor_routes before the
+        Workspace is reused.
+        """
+        end, arrival, fare_of = self.table.end_city, self.table.arrival_time, self.table.fare
+        inf = float('inf')
+        ws = self._scratch()
+        # label/pred: cheapest fare of each flight over all rounds so far and its predecessor.
+        # hops/first_pred: the round a flight is first reached and its predecessor in that
+        # round. Every flight on a least-flights route is first reached in its own round, so
+        # first_pred chains stay valid after later rounds overwrite pred.
+        best_fare, pred, hops, first_pred = ws.label, ws.pred, ws.hops, ws.first_pred
+        next_fare, next_pred, touched = ws.next_label, ws.next_pred, ws.touched
+        first_round = [0] * self.n
+        earliest, least_cheapest, cheapest = [-1] * self.n, [-1] * self.n, [-1] * self.n
+        cheapest_fare = [inf] * self.n
+        marked = self._start_candidates(start_city, t1, t2)
+        for i in marked:
+            best_fare[i], hops[i] = fare_of[i], 1
+            touched.append(i)
+        candidates = len(marked)
+        pops = relaxations = max_queue = 0
+        if end_city is not None:
+            component, reach = self._reachability()[:2]
+            target = component[end_city]
+
+        k = 1
+        while marked:
+            pops += len(marked)
+            max_queue = max(max_queue, len(marked))
+            next_marked = []
+            for flight in marked:
+                fare, city = best_fare[flight], end[flight]
+                if first_round[city] == 0 or first_round[city] == k:
+                    # The first round reaching a city settles both of its least-flights answers
+                    first_round[city] = k
+                    if earliest[city] == -1 or arrival[flight] < arrival[earliest[city]]:
+                        earliest[city] = flight
+                    if least_cheapest[city] == -1 or fare < best_fare[least_cheapest[city]]:
+                        least_cheapest[city] = flight
+                if fare < cheapest_fare[city]:
+                    cheapest[city], cheapest_fare[city] = flight, fare
+                if city == end_city:
+                    continue
+                if end_city is not None and component[city] != target and not reach[component[city]] >> target & 1:
+                    continue
+                onward = self._transfers(flight, t2)
+                relaxations += len(onward)
+                for j in onward:
+                    new_fare = fare + fare_of[j]
+                    if new_fare < best_fare[j] and new_fare < next_fare[j] and arrival[j] <= t2:
+                        if next_fare[j] == inf:
+                            next_marked.append(j)
+                            touched.append(j)
+                        next_fare[j] = new_fare
+                        next_pred[j] = flight
+            # A route is only extended while it is the cheapest way found so far to board
+            # its last flight, and while it can still beat the best fare to end_city
+            bound = inf if end_city is None else cheapest_fare[end_city]
+            marked = []
+            for j in next_marked:
+                fare, next_fare[j] = next_fare[j], inf
+                if fare < best_fare[j] and fare < bound:
+                    if hops[j] == inf:
+                        hops[j], first_pred[j] = k + 1, next_pred[j]
+                    best_fare[j], pred[j] = fare, next_pred[j]
+                    marked.append(j)
+            k += 1
+        if self._stats is not None:
+            self._stats.count(candidates, pops, relaxations, max_queue)
+        return earliest, cheapest, least_cheapest
+
+    def _raptor_routes(self, found, city):
+        """Rows of the three routes to city from the result of _raptor"""
+        earliest, cheapest, least_cheapest = (rows[city] for rows in found)
+        if earliest == -1:
+            return [], [], []
+        ws = self._workspace
+        cheapest = ws.chain(cheapest)
+        # Without a single end_city a cheapest chain may pass through city before ending
+        # there; the part up to the first arrival is at most as expensive
+        end = self.table.end_city
+        cheapest = cheapest[:next(i for i, row in enumerate(cheapest) if end[row] == city) + 1]
+        return ws.chain(earliest, ws.first_pred), cheapest, ws.chain(least_cheapest, ws.first_pred)
+
+    def batch_query(self, queries, objectives=OBJECTIVES):
+        """Answer many queries at once, sharing one search per start city and time window
+
+        Queries with the same (start_city, t1, t2) are answered from a single search to
+        every city, so a group costs about as much as one query. Cached answers are used
+        and new ones are cached.
+
+        Args:
+            queries (Iterable[Tuple[int, int, int, int]]): (start_city, end_city, t1, t2) tuples
+            objectives (Sequence[str]): Any of "least_flights_earliest", "cheapest" and
+                "least_flights_cheapest", the answers wanted for every query
+
+        Returns:
+            List[Tuple[List[Flight], ...]]: For each query in input order, one route per objective
+        """
+        return [tuple(self.table.route(rows) for rows in routes) for routes in self._batch_rows(queries, objectives)]
+
+    def _batch_rows(self, queries, objectives):
+        """batch_query with each route given as its rows"""
+        for objective in objectives:
+            if objective not in self.OBJECTIVES:
+                raise ValueError(f"Unknown objective {objective!r}, expected one of {self.OBJECTIVES}")
+        queries = [tuple(query) for query in queries]
+        stats = None
+        if self.stats is not None:
+            self._stats = stats = self.SearchStats()
+            stats.queries = len(queries)
+            clock = time.perf_counter()
+        answers = {}
+        groups = {}
+        for query in dict.fromkeys(queries):
+            start_city, end_city, t1, t2 = query
+            if start_city == end_city:
+                answers[query] = ([], [], [])
+                continue
+            if self._unreachable(start_city, end_city, t1, t2):
+                answers[query] = ([], [], [])
+                if stats:
+                    stats.rejected += 1
+                continue
+            cached = {}
+            if self.cache is not None:
+                cached = {objective: self.cache.get((objective,) + query) for objective in objectives}
+            if cached and None not in cached.values():
+                answers[query] = [cached.get(objective, []) for objective in self.OBJECTIVES]
+                if stats:
+                    stats.cache_hits += 1
+            else:
+                groups.setdefault((start_city, t1, t2), []).append(query)
+        if stats:
+            clock = self._phase(stats, "cache", clock)
+
+        try:
+            for (start_city, t1, t2), group in groups.items():
+                end_city = group[0][1] if len(group) == 1 else None
+                found = self._raptor(start_city, t1, t2, end_city)
+                if stats:
+                    clock = self._phase(stats, "search", clock)
+                for query in group:
+                    answers[query] = self._raptor_routes(found, query[1])
+                    if self.cache is not None:
+                        for objective, rows in zip(self.OBJECTIVES, answers[query]):
+                            self.cache.put((objective,) + query, rows)
+                if stats:
+                    clock = self._phase(stats, "routes", clock)
+        finally:
+            self._stats = None
+        if stats:
+            self._record(stats)
+
+        picks = [self.OBJECTIVES.index(objective) for objective in objectives]
+        return [tuple(answers[query][k] for k in picks) for query in queries]
@@ -0,0 +1,198 @@
+import argparse
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+import json
+from loader import read_edge_list
+from parallel import ParallelPlanner
+from planner import Planner
+
+class PlannerServer:
+    def __init__(self, planner, workers=0, max_batch=64, max_delay=0.002):
+        """Serves a warm Planner over a local socket, one JSON object per line
+
+        A request is {"id": ..., "start_city": int, "end_city": int, "t1": int, "t2": int}
+        with optional "objectives" (a subset of Planner.OBJECTIVES, all by default). The
+        reply {"id": ..., "routes": {objective: route}} gives each route as a list of
+        [flight_no, start_city, departure_time, end_city, arrival_time, fare]; a bad request
+        gets {"id": ..., "error": message}. Replies are written as soon as they are ready,
+        so they may come back out of order. {"op": "stats"} returns the server counters.
+
+        Requests arriving within max_delay seconds of each other are answered together by
+        Planner.batch_query, at most max_batch at a time, and a request identical to one
+        still being answered waits for that answer instead of being computed again.
+
+        Args:
+            planner (Planner): The planner to serve; it must not be changed while serving
+            workers (int): Worker processes sharing the planner through ParallelPlanner, 0
+                answers the batches on one thread of this process
+            max_batch (int): Most queries per batch
+            max_delay (float): Longest time in seconds a request waits for its batch to fill
+        """
+        self.planner = planner
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.pool = ParallelPlanner(planner, workers) if workers else None
+        # A single thread owns the planner (or the pool), the event loop never blocks on a search
+        self.executor = ThreadPoolExecutor(max_workers=1)
+        self.pending = None
+        self.in_flight = {}     # (start_city, end_city, t1, t2, objectives) -> Future of its routes
+        self.server = None
+        self.batcher = None
+        self.dispatches = set()  # batches being answered
+        self.clients = {}       # handler task -> reader of each open connection
+        self.counters = {"requests": 0, "coalesced": 0, "batches": 0, "queries": 0}
+
+    async def start(self, path=None, host="127.0.0.1", port=0):
+        """Listen on the Unix socket path, or on host:port when no path is given"""
+        self.pending = asyncio.Queue()
+        self.batcher = asyncio.create_task(self._collect())
+        if path is not None:
+            self.server = await asyncio.start_unix_server(self._client, path=path)
+        else:
+            self.server = await asyncio.start_server(self._client, host, port)
+        return self.server
+
+    async def close(self):
+        """Stop listening, hang up on the clients once their replies are written, stop the workers"""
+        self.server.close()
+        for reader in self.clients.values():
+            reader.feed_eof()
+        await asyncio.gather(*self.clients, return_exceptions=True)
+        await self.server.wait_closed()
+        self.batcher.cancel()
+        await asyncio.gather(*self.dispatches, return_exceptions=True)
+        self.executor.shutdown()
+        if self.pool is not None:
+            self.pool.close()
+
+    def query(self, start_city, end_city, t1, t2, objectives=Planner.OBJECTIVES):
+        """Future of {objective: route} for one query, shared with identical queries in flight"""
+        self.counters["requests"] += 1
+        key = (start_city, end_city, t1, t2, tuple(objectives))
+        future = self.in_flight.get(key)
+        if future is None:
+            future = asyncio.get_running_loop().create_future()
+            self.in_flight[key] = future
+            self.pending.put_nowait(key)
+        else:
+            self.counters["coalesced"] += 1
+        return future
+
+    async def _collect(self):
+        """Gather pending queries into batches and start answering each batch"""
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.pending.get()]
+            deadline = loop.time() + self.max_delay
+            while len(batch) < self.max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self.pending.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            task = loop.create_task(self._dispatch(batch))
+            self.dispatches.add(task)
+            task.add_done_callback(self.dispatches.discard)
+
+    async def _dispatch(self, batch):
+        loop = asyncio.get_running_loop()
+        groups = {}
+        for key in batch:
+            groups.setdefault(key[4], []).append(key)
+        for objectives, keys in groups.items():
+            self.counters["batches"] += 1
+            self.counters["queries"] += len(keys)
+            try:
+                results = await loop.run_in_executor(self.executor, self._answer_batch,
+                                                     [key[:4] for key in keys], objectives)
+            except Exception as error:
+                for key in keys:
+                    self.in_flight.pop(key).set_exception(error)
+                continue
+            for key, routes in zip(keys, results):
+                self.in_flight.pop(key).set_result(routes)
+
+    def _answer_batch(self, queries, objectives):
+        """Run in the executor thread: {objective: route} per query, ready for JSON"""
+        results = (self.pool or self.planner).batch_query(queries, objectives)
+        return [{objective: [list(flight.as_tuple()) for flight in route] for objective, route in zip(objectives, routes)}
+                for routes in results]
+
+    async def _client(self, reader, writer):
+        lock = asyncio.Lock()
+        tasks = set()
+        self.clients[asyncio.current_task()] = reader
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                if not line.strip():
+                    continue
+                task = asyncio.create_task(self._reply(line, writer, lock))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+            await asyncio.gather(*tasks)
+        finally:
+            del self.clients[asyncio.current_task()]
+            writer.close()
+
+    async def _reply(self, line, writer, lock):
+        request_id = None
+        try:
+            request = json.loads(line)
+            if not isinstance(request, dict):
+                raise ValueError("A request must be a JSON object")
+            request_id = request.get("id")
+            if request.get("op", "query") == "stats":
+                reply = {"id": request_id, "stats": dict(self.counters)}
+            elif request.get("op", "query") == "query":
+                query = [request[field] for field in ("start_city", "end_city", "t1", "t2")]
+                if not all(isinstance(value, int) for value in query):
+                    raise ValueError("start_city, end_city, t1 and t2 must be integers")
+                objectives = tuple(request.get("objectives", Planner.OBJECTIVES))
+                for objective in objectives:
+                    if objective not in Planner.OBJECTIVES:
+                        raise ValueError(f"Unknown objective {objective!r}, expected one of {Planner.OBJECTIVES}")
+                routes = await self.query(*query, objectives)
+                reply = {"id": request_id, "routes": routes}
+            else:
+                raise ValueError(f"Unknown op {request['op']!r}")
+        except KeyError as error:
+            reply = {"id": request_id, "error": f"Missing field {error.args[0]!r}"}
+        except Exception as error:
+            reply = {"id": request_id, "error": str(error)}
+        async with lock:
+            writer.write(json.dumps(reply).encode() + b"\n")
+            await writer.drain()
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve flight queries over a local socket")
+    parser.add_argument("flights", help="an edge-list file, or a snapshot with --snapshot")
+    parser.add_argument("--snapshot", action="store_true", help="the file was written by Planner.save")
+    parser.add_argument("--socket", help="Unix socket path, instead of TCP")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--workers", type=int, default=0)
+    parser.add_argument("--cache-size", type=int, default=0)
+    args = parser.parse_args()
+    if args.snapshot:
+        planner = Planner.load(args.flights, cache_size=args.cache_size)
+    else:
+        planner = Planner(read_edge_list(args.flights), cache_size=args.cache_size)
+
+    async def serve():
+        server = PlannerServer(planner, workers=args.workers)
+        listener = await server.start(args.socket, args.host, args.port)
+        print("Listening on", args.socket or listener.sockets[0].getsockname(), flush=True)
+        try:
+            await listener.serve_forever()
+        finally:
+            await server.close()
+
+    asyncio.run(serve())
+
+if __name__ == "__main__":
+    main()
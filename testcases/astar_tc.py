@@ -0,0 +1,68 @@
+import random
+from planner import Planner
+from alam_tc import generate_random_flights
+from update_tc import generate_flights, random_change, is_valid, NUM_CITIES, MAX_TIME
+
+
+def keys(planner, query):
+    """The fares A* must find: cheapest, then (flights, fare)"""
+    cheapest = planner.cheapest_route(*query)
+    least_cheapest = planner.least_flights_cheapest_route(*query)
+    if not (is_valid(cheapest, *query) and is_valid(least_cheapest, *query)):
+        return "invalid route"
+    return (sum(f.fare for f in cheapest) if cheapest else None,
+            (len(least_cheapest), sum(f.fare for f in least_cheapest)) if least_cheapest else None)
+
+
+def same_answers(astar, plain, queries):
+    for query in queries:
+        got, expected = keys(astar, query), keys(plain, query)
+        if got != expected:
+            print('Validation failed: A* disagrees with the plain search')
+            print('query:', query)
+            print('A*:   ', got)
+            print('plain:', expected)
+            return False
+    return True
+
+
+def all_pairs(t1, t2):
+    return [(s, e, t1, t2) for s in range(NUM_CITIES) for e in range(NUM_CITIES) if s != e]
+
+
+def check_small_networks():
+    """Every city pair, then after each change: the bounds must stay lower bounds"""
+    for seed in range(20):
+        rng = random.Random(seed)
+        flights = {f.flight_no: f for f in generate_flights(rng, 50)}
+        astar = Planner(list(flights.values()), astar=True, queue=Planner.QUEUES[seed % 3])
+        t1, t2 = (0, MAX_TIME + 200) if seed % 2 else (100, 450)
+        if not same_answers(astar, Planner(list(flights.values())), all_pairs(t1, t2)):
+            return False
+        removed, next_no = [], len(flights)
+        for step in range(12):
+            next_no = random_change(rng, astar, flights, removed, next_no)
+            if not same_answers(astar, Planner(list(flights.values())), all_pairs(t1, t2)):
+                print(f'seed {seed}, after change {step + 1}')
+                return False
+    return True
+
+
+def check_large_network():
+    random.seed(5)
+    flights = generate_random_flights(60, 5000, 3000, 300)
+    rng = random.Random(5)
+    queries = []
+    for _ in range(100):
+        t1 = rng.randrange(1500)
+        queries.append((rng.randrange(60), rng.randrange(60), t1, t1 + rng.randrange(500, 2500)))
+    return same_answers(Planner(flights, astar=True), Planner(flights), queries)
+
+
+def run_tests():
+    if check_small_networks() and check_large_network():
+        print('Passed A* cheapest and least flights cheapest')
+
+
+if __name__ == "__main__":
+    run_tests()
@@ -0,0 +1,65 @@
+import random
+from planner import Planner
+from alam_tc import generate_random_flights
+from update_tc import generate_flights, random_change, is_valid, NUM_CITIES, MAX_TIME
+
+
+def key(route):
+    """What both backends must agree on: ties may be broken differently"""
+    return (len(route), route[-1].arrival_time) if route else None
+
+
+def same_answers(bfs, csa, queries):
+    """Compare least_flights_earliest_route of the two backends on every query"""
+    for query in queries:
+        expected = bfs.least_flights_earliest_route(*query)
+        got = csa.least_flights_earliest_route(*query)
+        if key(got) != key(expected) or not is_valid(got, *query):
+            print("Validation failed: the csa backend disagrees with bfs")
+            print('query:', query)
+            print('csa route:', [f.flight_no for f in got])
+            print('bfs route:', [f.flight_no for f in expected])
+            return False
+    return True
+
+
+def all_pairs(t1, t2):
+    return [(s, e, t1, t2) for s in range(NUM_CITIES) for e in range(NUM_CITIES) if s != e]
+
+
+def check_small_networks():
+    """Every city pair of small networks, then after each of a series of changes"""
+    for seed in range(20):
+        rng = random.Random(seed)
+        flights = {f.flight_no: f for f in generate_flights(rng, 50)}
+        csa = Planner(list(flights.values()), backend="csa")
+        t1, t2 = (0, MAX_TIME + 200) if seed % 2 else (100, 400)
+        if not same_answers(Planner(list(flights.values())), csa, all_pairs(t1, t2)):
+            return False
+        removed, next_no = [], len(flights)
+        for step in range(10):
+            next_no = random_change(rng, csa, flights, removed, next_no)
+            if not same_answers(Planner(list(flights.values())), csa, all_pairs(t1, t2)):
+                print(f'seed {seed}, after change {step + 1}')
+                return False
+    return True
+
+
+def check_large_network():
+    random.seed(2)
+    flights = generate_random_flights(40, 5000, 3000, 300)
+    rng = random.Random(2)
+    queries = []
+    for _ in range(300):
+        t1 = rng.randrange(1500)
+        queries.append((rng.randrange(40), rng.randrange(40), t1, t1 + rng.randrange(200, 2000)))
+    return same_answers(Planner(flights), Planner(flights, backend="csa"), queries)
+
+
+def run_tests():
+    if check_small_networks() and check_large_network():
+        print('Passed csa backend')
+
+
+if __name__ == "__main__":
+    run_tests()
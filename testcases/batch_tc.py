@@ -0,0 +1,78 @@
+import random
+from planner import Planner
+from update_tc import generate_flights, is_valid, NUM_CITIES, MAX_TIME
+
+# Planner method answering each objective alone
+METHODS = {
+    "least_flights_earliest": "least_flights_earliest_route",
+    "cheapest": "cheapest_route",
+    "least_flights_cheapest": "least_flights_cheapest_route",
+}
+
+
+def key(objective, route):
+    """What batch_query and the single queries must agree on: ties may be broken differently"""
+    if not route:
+        return None
+    fare = sum(f.fare for f in route)
+    if objective == "least_flights_earliest":
+        return len(route), route[-1].arrival_time
+    if objective == "cheapest":
+        return fare
+    return len(route), fare
+
+
+def make_queries(rng, count):
+    """Queries sharing a few start cities and windows, so most of them are answered in groups"""
+    windows = [(0, MAX_TIME + 200), (100, 400), (rng.randrange(200), MAX_TIME)]
+    queries = []
+    for _ in range(count):
+        t1, t2 = rng.choice(windows)
+        queries.append((rng.randrange(NUM_CITIES), rng.randrange(NUM_CITIES), t1, t2))
+    # Repeated queries and one group of a single query
+    return queries + queries[:5] + [(0, 1, 7, 650)]
+
+
+def check_batch(planner, reference, queries, objectives):
+    results = planner.batch_query(queries, objectives)
+    if len(results) != len(queries):
+        print(f'Validation failed: {len(results)} answers for {len(queries)} queries')
+        return False
+    for query, routes in zip(queries, results):
+        for objective, route in zip(objectives, routes):
+            expected = getattr(reference, METHODS[objective])(*query)
+            if key(objective, route) != key(objective, expected) or not is_valid(route, *query):
+                print(f'Validation failed on batch_query {objective}, query {query}')
+                print('batch route: ', [f.flight_no for f in route])
+                print('single route:', [f.flight_no for f in expected])
+                return False
+    return True
+
+
+def check_bad_objective(planner):
+    try:
+        planner.batch_query([(0, 1, 0, 100)], ["fastest"])
+    except ValueError:
+        return True
+    print('Validation failed: batch_query accepted an unknown objective')
+    return False
+
+
+def run_tests():
+    for seed in range(20):
+        rng = random.Random(seed)
+        flights = generate_flights(rng, 60)
+        reference = Planner(flights)
+        # With a cache, the second batch is answered from it
+        planner = Planner(flights, cache_size=100 * (seed % 2))
+        queries = make_queries(rng, 60)
+        for objectives in (Planner.OBJECTIVES, ("cheapest",), ("least_flights_cheapest", "least_flights_earliest")):
+            if not check_batch(planner, reference, queries, objectives):
+                print(f'{seed=}, {objectives=}')
+                return
+    if check_bad_objective(Planner(flights)):
+        print('Passed batch_query')
+
+
+if __name__ == "__main__":
+    run_tests()
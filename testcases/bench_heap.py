@@ -0,0 +1,123 @@
+import heapq
+import random
+import time
+from planner import Planner
+
+class OriginalHeap:
+    """The planner's original heap (before IndexedHeap): recursive sifts, a comparison
+    callback per swap, no decrease-key"""
+    def __init__(self, comparison_function):
+        self.compare = comparison_function
+        self.data = []
+
+    def upheap(self, index):
+        parent = (index - 1) // 2
+        if index > 0 and self.compare(self.data[index], self.data[parent]):
+            self.data[index], self.data[parent] = self.data[parent], self.data[index]
+            self.upheap(parent)
+
+    def downheap(self, index):
+        left_child = 2 * index + 1
+        right_child = 2 * index + 2
+        smallest = index
+        if left_child < len(self.data) and self.compare(self.data[left_child], self.data[smallest]):
+            smallest = left_child
+        if right_child < len(self.data) and self.compare(self.data[right_child], self.data[smallest]):
+            smallest = right_child
+        if smallest != index:
+            self.data[index], self.data[smallest] = self.data[smallest], self.data[index]
+            self.downheap(smallest)
+
+    def insert(self, value):
+        self.data.append(value)
+        self.upheap(len(self.data) - 1)
+
+    def extract(self):
+        if len(self.data) == 0:
+            return None
+        if len(self.data) == 1:
+            return self.data.pop()
+        top_value = self.data[0]
+        self.data[0] = self.data.pop()
+        self.downheap(0)
+        return top_value
+
+def dijkstra_like_workload(n, decrease_ratio, seed):
+    """Operations of a Dijkstra run: n inserts, some decrease-keys, pops until empty.
+
+    Returns a list of ("push", item, key) / ("pop",) tuples so every heap replays the same run.
+    """
+    random.seed(seed)
+    ops = []
+    keys = {}
+    queued = 0
+    for item in range(n):
+        keys[item] = random.randint(0, 10 * n)
+        ops.append(("push", item, keys[item]))
+        queued += 1
+        if random.random() < decrease_ratio:
+            victim = random.randrange(item + 1)
+            keys[victim] = max(0, keys[victim] - random.randint(1, n))
+            ops.append(("push", victim, keys[victim]))
+        if queued and random.random() < 0.3:
+            ops.append(("pop",))
+            queued -= 1
+    ops.extend([("pop",)] * queued)
+    return ops
+
+def run_lazy(ops, n, push, pop):
+    # Without decrease-key a lower key is inserted again and stale copies are skipped
+    # when extracted, as the planner searches did with the original heap
+    best = [float("inf")] * n
+    done = [False] * n
+    start = time.perf_counter()
+    for op in ops:
+        if op[0] == "push":
+            _, item, key = op
+            if key < best[item]:
+                best[item] = key
+                push((key, item))
+        else:
+            while True:
+                entry = pop()
+                if entry is None:
+                    break
+                key, item = entry
+                if not done[item] and key == best[item]:
+                    done[item] = True
+                    break
+    return time.perf_counter() - start
+
+def run_original_heap(ops, n):
+    pq = OriginalHeap(lambda a, b: a[0] < b[0])
+    return run_lazy(ops, n, pq.insert, pq.extract)
+
+def run_heapq(ops, n):
+    pq = []
+    return run_lazy(ops, n, lambda entry: heapq.heappush(pq, entry),
+                    lambda: heapq.heappop(pq) if pq else None)
+
+def run_indexed_heap(ops, n):
+    pq = Planner.IndexedHeap(n)
+    start = time.perf_counter()
+    for op in ops:
+        if op[0] == "push":
+            pq.push(op[1], op[2])
+        elif pq:
+            pq.pop()
+    return time.perf_counter() - start
+
+def main():
+    print(f"{'items':>8} {'decrease':>9} {'original (s)':>13} {'heapq (s)':>10} {'IndexedHeap (s)':>16} "
+          f"{'vs original':>12} {'vs heapq':>9}")
+    for n in (1000, 10000, 100000):
+        for decrease_ratio in (0.0, 0.5, 1.0):
+            ops = dijkstra_like_workload(n, decrease_ratio, seed=n)
+            original = run_original_heap(ops, n)
+            lazy = run_heapq(ops, n)
+            indexed = run_indexed_heap(ops, n)
+            print(f"{n:>8} {decrease_ratio:>9} {original:>13.4f} {lazy:>10.4f} {indexed:>16.4f} "
+                  f"{original / indexed:>11.2f}x {lazy / indexed:>8.2f}x")
+
+if __name__ == "__main__":
+    main()
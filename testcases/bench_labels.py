@@ -0,0 +1,65 @@
+import argparse
+import random
+import time
+from planner import Planner
+from alam_tc import generate_random_flights
+from bench_suite import with_hubs, make_queries, MAX_TIME, MAX_FARE
+
+# Budgets as multiples of the query's cheapest fare, None for no budget
+BUDGETS = (1.0, 1.5, 3.0, None)
+
+def run(num_flights, num_cities, hub_share, num_queries):
+    """One row per budget: label counts and latency of earliest_route_within_budget"""
+    random.seed(num_flights * 1000 + num_cities)
+    flights = with_hubs(generate_random_flights(num_cities, num_flights, MAX_TIME, MAX_FARE),
+                        num_cities, hub_share, seed=num_flights)
+    planner = Planner(flights, stats=True)
+    # Only queries with a route say anything about the labels
+    queries = []
+    for query in make_queries(num_cities, 20 * num_queries, seed=num_flights):
+        route = planner.cheapest_route(*query)
+        if route:
+            queries.append((query, sum(f.fare for f in route)))
+        if len(queries) == num_queries:
+            break
+    rows = []
+    for factor in BUDGETS:
+        stats = Planner.SearchStats()
+        seconds = 0.0
+        for query, cheapest in queries:
+            budget = float('inf') if factor is None else int(factor * cheapest)
+            start = time.perf_counter()
+            planner.earliest_route_within_budget(*query, budget)
+            seconds += time.perf_counter() - start
+            stats += planner.last_stats
+        rows.append({
+            "budget": "none" if factor is None else f"{factor}x",
+            "queries": len(queries),
+            "scanned": stats.pops,
+            "labels": stats.relaxations,
+            "labels_per_flight": stats.relaxations / stats.pops if stats.pops else 0.0,
+            "largest_set": stats.max_queue,
+            "ms_per_query": 1000 * seconds / len(queries) if queries else 0.0,
+        })
+    return rows
+
+def main():
+    parser = argparse.ArgumentParser(description="Label set sizes of the budget-constrained earliest arrival search")
+    parser.add_argument("--flights", type=int, nargs="+", default=[5000, 20000])
+    parser.add_argument("--cities", type=int, nargs="+", default=[100])
+    parser.add_argument("--hubs", type=float, nargs="+", default=[0.0, 0.5, 0.9])
+    parser.add_argument("--queries", type=int, default=30)
+    args = parser.parse_args()
+
+    print(f"{'flights':>7} {'cities':>6} {'hubs':>4} {'budget':>6} {'queries':>7} {'scanned':>9} "
+          f"{'labels':>9} {'per flight':>10} {'largest':>7} {'ms/query':>9}")
+    for num_flights in args.flights:
+        for num_cities in args.cities:
+            for hub_share in args.hubs:
+                for row in run(num_flights, num_cities, hub_share, args.queries):
+                    print(f"{num_flights:>7} {num_cities:>6} {hub_share:>4} {row['budget']:>6} {row['queries']:>7} "
+                          f"{row['scanned']:>9} {row['labels']:>9} {row['labels_per_flight']:>10.2f} "
+                          f"{row['largest_set']:>7} {row['ms_per_query']:>9.3f}")
+
+if __name__ == "__main__":
+    main()
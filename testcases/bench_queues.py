@@ -0,0 +1,56 @@
+import os
+import random
+import time
+from flight import Flight
+from planner import Planner
+from alam_tc import generate_random_flights
+from videep_tc import EnhancedFlightPlannerTester
+
+def load_edge_list(file_path):
+    flights = []
+    with open(file_path, 'r') as file:
+        file.readline()
+        for line in file:
+            u, v, cost, start_time, end_time = map(int, line.split())
+            flights.append(Flight(len(flights), u, start_time, v, end_time, cost))
+    return flights
+
+def fare_distributions():
+    """(name, flights, t2) for the fare distributions our testers generate"""
+    random.seed(7)
+    yield "alam uniform fares 10..300", generate_random_flights(100, 5000, 5000, 300), 5000
+    random.seed(7)
+    yield "alam uniform fares 10..100000", generate_random_flights(100, 5000, 5000, 100000), 5000
+    tester = EnhancedFlightPlannerTester()
+    tester.MAX_FLIGHTS_PER_CITY = 1000
+    flights = tester.generate_test_flights(num_cities=100, num_flights=5000, max_time=5000, max_fare=600,
+                                           connectivity=0.3, time_distribution="clustered")
+    yield "videep duration-based fares", flights, 5000
+    if os.path.exists("c.txt"):
+        yield "c.txt edge list", load_edge_list("c.txt"), 3000000000000
+
+def time_queries(planner, method, queries):
+    start = time.perf_counter()
+    for start_city, end_city, t1, t2 in queries:
+        getattr(planner, method)(start_city, end_city, t1, t2)
+    return time.perf_counter() - start
+
+def main():
+    for name, flights, t2 in fare_distributions():
+        num_cities = 1 + max(max(f.start_city, f.end_city) for f in flights)
+        max_fare = max(f.fare for f in flights)
+        random.seed(1)
+        queries = [(random.randrange(num_cities), random.randrange(num_cities), 0, t2) for _ in range(10)]
+        print(f"\n{name}: {len(flights)} flights, {num_cities} cities, max fare {max_fare}")
+        print(f"{'queue':>8} {'cheapest (s)':>13} {'least flights cheapest (s)':>27}")
+        for queue in Planner.QUEUES:
+            if queue == "dial" and max_fare > Planner.DIAL_MAX_FARE:
+                print(f"{queue:>8}  skipped, fares too wide for one bucket per value (a RadixHeap is used)")
+                continue
+            planner = Planner(flights, queue=queue)
+            cheapest = time_queries(planner, "cheapest_route", queries)
+            least_cheapest = time_queries(planner, "least_flights_cheapest_route", queries)
+            print(f"{queue:>8} {cheapest:>13.4f} {least_cheapest:>27.4f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,188 @@
+import argparse
+import json
+import math
+import platform
+import random
+import sys
+import time
+import tracemalloc
+from flight import Flight
+from planner import Planner
+from alam_tc import generate_random_flights
+from videep_tc import EnhancedFlightPlannerTester
+
+# (objective, Planner method)
+OBJECTIVES = (
+    ("least_flights_earliest", "least_flights_earliest_route"),
+    ("cheapest", "cheapest_route"),
+    ("least_flights_cheapest", "least_flights_cheapest_route"),
+)
+
+# (engine, Planner options, objectives it changes); the queue does not affect the BFS/CSA
+# search and the backend does not affect the fare searches, so each pairing is run once
+ENGINES = (
+    ("bfs", {"backend": "bfs"}, ("least_flights_earliest",)),
+    ("csa", {"backend": "csa"}, ("least_flights_earliest",)),
+    ("binary", {"queue": "binary"}, ("cheapest", "least_flights_cheapest")),
+    ("dial", {"queue": "dial"}, ("cheapest", "least_flights_cheapest")),
+    ("radix", {"queue": "radix"}, ("cheapest", "least_flights_cheapest")),
+    ("astar", {"astar": True}, ("cheapest", "least_flights_cheapest")),
+)
+
+MAX_TIME = 5000
+MAX_FARE = 600
+
+def with_hubs(flights, num_cities, hub_share, seed):
+    """Reroute a share of the flight endpoints through a few hub cities
+
+    A hub_share of 0 keeps the generator's network, 0.5 sends about half of the flights
+    into or out of one of max(1, num_cities // 20) hubs.
+    """
+    rng = random.Random(seed)
+    hubs = range(max(1, num_cities // 20))
+    result = []
+    for f in flights:
+        start_city, end_city = f.start_city, f.end_city
+        if rng.random() < hub_share:
+            hub = rng.choice(hubs)
+            if rng.random() < 0.5:
+                start_city = hub
+            else:
+                end_city = hub
+            if start_city == end_city:
+                start_city, end_city = f.start_city, f.end_city
+        result.append(Flight(f.flight_no, start_city, f.departure_time, end_city, f.arrival_time, f.fare))
+    return result
+
+def networks(sizes, cities, hub_shares):
+    """(parameters, flights) for every point of the sweep, the same for every run"""
+    for generator in ("alam", "videep"):
+        for num_flights in sizes:
+            for num_cities in cities:
+                random.seed(num_flights * 1000 + num_cities)
+                if generator == "alam":
+                    flights = generate_random_flights(num_cities, num_flights, MAX_TIME, MAX_FARE)
+                else:
+                    tester = EnhancedFlightPlannerTester()
+                    tester.MAX_FLIGHTS_PER_CITY = num_flights
+                    random.seed(num_flights * 1000 + num_cities)
+                    flights = tester.generate_test_flights(num_cities, num_flights, MAX_TIME, MAX_FARE,
+                                                           connectivity=0.3, time_distribution="clustered")
+                for hub_share in hub_shares:
+                    params = {"generator": generator, "flights": len(flights), "cities": num_cities,
+                              "hub_share": hub_share}
+                    yield params, with_hubs(flights, num_cities, hub_share, seed=num_flights)
+
+def make_queries(num_cities, count, seed):
+    rng = random.Random(seed)
+    queries = []
+    for _ in range(count):
+        t1 = rng.randrange(MAX_TIME // 2)
+        queries.append((rng.randrange(num_cities), rng.randrange(num_cities), t1,
+                        t1 + rng.randrange(MAX_TIME // 4, MAX_TIME)))
+    return queries
+
+def percentile(sorted_values, p):
+    """Nearest-rank percentile: the smallest value at least p percent of the values reach"""
+    return sorted_values[max(0, math.ceil(p / 100 * len(sorted_values)) - 1)]
+
+def measure(planner, method, queries):
+    """Latencies (s) of the queries, then their peak traced memory in a second, traced pass
+
+    One untimed query first builds the lazy indexes and workspace, so they do not land in
+    the first latency. p99 is only a tail with 100 queries or more; max is reported apart.
+    """
+    run = getattr(planner, method)
+    run(*queries[0])
+    latencies = []
+    for query in queries:
+        start = time.perf_counter()
+        run(*query)
+        latencies.append(time.perf_counter() - start)
+    tracemalloc.start()
+    for query in queries:
+        run(*query)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    latencies.sort()
+    total = sum(latencies)
+    return {
+        "queries": len(queries),
+        "p50_ms": 1000 * percentile(latencies, 50),
+        "p99_ms": 1000 * percentile(latencies, 99),
+        "max_ms": 1000 * latencies[-1],
+        "throughput_qps": len(queries) / total if total else None,
+        "peak_query_bytes": peak,
+    }
+
+def build(flights, options):
+    """Return (planner, build seconds, peak traced bytes of the build)"""
+    start = time.perf_counter()
+    Planner(flights, **options)
+    seconds = time.perf_counter() - start
+    tracemalloc.start()
+    planner = Planner(flights, **options)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return planner, seconds, peak
+
+def run_suite(sizes, cities, hub_shares, num_queries):
+    results = []
+    for params, flights in networks(sizes, cities, hub_shares):
+        queries = make_queries(params["cities"], num_queries, seed=len(flights))
+        for engine, options, objectives in ENGINES:
+            planner, build_seconds, build_peak = build(flights, options)
+            for objective, method in OBJECTIVES:
+                if objective not in objectives:
+                    continue
+                row = dict(params, engine=engine, objective=objective, build_s=build_seconds,
+                           peak_build_bytes=build_peak)
+                row.update(measure(planner, method, queries))
+                results.append(row)
+                print(f"{params['generator']:>7} {params['flights']:>7} {params['cities']:>6} "
+                      f"{params['hub_share']:>4} {engine:>7} {objective:>23} "
+                      f"{row['p50_ms']:>9.3f} {row['p99_ms']:>9.3f} {row['max_ms']:>9.3f} {row['throughput_qps']:>9.1f} "
+                      f"{row['peak_query_bytes'] / 1024:>10.1f}")
+    return results
+
+def key(row):
+    return (row["generator"], row["flights"], row["cities"], row["hub_share"], row["engine"], row["objective"])
+
+def compare(results, baseline_path, threshold):
+    """Print the cases whose p50 got slower than threshold times the baseline's"""
+    with open(baseline_path) as file:
+        baseline = {key(row): row for row in json.load(file)["results"]}
+    slower = 0
+    for row in results:
+        old = baseline.get(key(row))
+        if old and old["p50_ms"] and row["p50_ms"] > threshold * old["p50_ms"]:
+            slower += 1
+            print(f"regression {key(row)}: p50 {old['p50_ms']:.3f} -> {row['p50_ms']:.3f} ms")
+    print(f"{slower} of {len(results)} cases slower than {threshold}x the baseline")
+
+def main():
+    parser = argparse.ArgumentParser(description="Latency, throughput and memory of the Planner queries")
+    parser.add_argument("--flights", type=int, nargs="+", default=[1000, 5000, 20000])
+    parser.add_argument("--cities", type=int, nargs="+", default=[50, 500])
+    parser.add_argument("--hubs", type=float, nargs="+", default=[0.0, 0.5])
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--quick", action="store_true", help="one small network per generator")
+    parser.add_argument("--output", default="bench_results.json")
+    parser.add_argument("--compare", help="results file of an earlier run")
+    parser.add_argument("--threshold", type=float, default=1.25)
+    args = parser.parse_args()
+    if args.quick:
+        args.flights, args.cities, args.hubs, args.queries = [1000], [50], [0.0, 0.5], 100
+
+    print(f"{'gen':>7} {'flights':>7} {'cities':>6} {'hubs':>4} {'engine':>7} {'objective':>23} "
+          f"{'p50 ms':>9} {'p99 ms':>9} {'max ms':>9} {'q/s':>9} {'peak KiB':>10}")
+    results = run_suite(args.flights, args.cities, args.hubs, args.queries)
+    with open(args.output, "w") as file:
+        json.dump({"python": sys.version.split()[0], "platform": platform.platform(),
+                   "max_time": MAX_TIME, "max_fare": MAX_FARE, "results": results}, file, indent=1)
+    print(f"Results written to {args.output}")
+    if args.compare:
+        compare(results, args.compare, args.threshold)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,19 @@
+from queries_tc import run_checks, fare
+
+
+def validate_budget(planner, query, all_routes, budget):
+    """earliest_route_within_budget arrives first among the routes within budget, then has
+    the fewest flights, then is the cheapest"""
+    route = planner.earliest_route_within_budget(*query, budget)
+    expected = min(((r[-1].arrival_time, len(r), fare(r)) for r in all_routes if fare(r) <= budget), default=None)
+    got = (route[-1].arrival_time, len(route), fare(route)) if route else None
+    return got == expected, [route], (got, expected)
+
+
+def run_tests():
+    if run_checks((("earliest_route_within_budget", validate_budget, (-1, 0, 20, 50, 100, 10 ** 6)),)):
+        print('Passed earliest_route_within_budget')
+
+
+if __name__ == "__main__":
+    run_tests()
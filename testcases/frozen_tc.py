@@ -0,0 +1,138 @@
+import random
+import threading
+from flight import Flight
+from frozen import FrozenPlanner, PlannerHolder
+from planner import Planner
+from update_tc import generate_flights, random_flight, summary, NUM_CITIES, MAX_TIME, MAX_FARE
+
+NUM_READERS = 4
+T1, T2 = 0, MAX_TIME + 200
+PAIRS = [(s, e) for s in range(NUM_CITIES) for e in range(NUM_CITIES) if s != e]
+
+
+def expected_summaries(flights):
+    planner = Planner(list(flights.values()))
+    return {pair: summary(planner, *pair, T1, T2) for pair in PAIRS}
+
+
+def start_readers(reader, errors):
+    """Run reader(seed, errors) on NUM_READERS threads, an exception counts as an error"""
+    def run(seed):
+        try:
+            reader(seed, errors)
+        except Exception as error:
+            errors.append(f'reader {seed} raised {error!r}')
+
+    threads = [threading.Thread(target=run, args=(seed,)) for seed in range(NUM_READERS)]
+    for thread in threads:
+        thread.start()
+    return threads
+
+
+def check_frozen(flights, options):
+    """Threads querying one FrozenPlanner in different orders get the Planner's answers"""
+    planner = Planner(list(flights.values()), **options)
+    frozen = FrozenPlanner.of(planner, cache_size=50, stats=True)
+    expected = expected_summaries(flights)
+    # Changes to the planner after freezing are not seen
+    planner.remove_flight(next(iter(flights)))
+
+    def reader(seed, errors):
+        pairs = PAIRS * 2
+        random.Random(seed).shuffle(pairs)
+        for pair in pairs:
+            if summary(frozen, *pair, T1, T2) != expected[pair]:
+                errors.append(f'FrozenPlanner{options} answered {pair} differently')
+            if frozen.last_stats.queries != 1:
+                errors.append(f'last_stats of another thread: {frozen.last_stats}')
+
+    errors = []
+    for thread in start_readers(reader, errors):
+        thread.join()
+    # summary makes four queries per pair
+    if not errors and frozen.stats.queries != 4 * 2 * len(PAIRS) * NUM_READERS:
+        errors.append(f'summed stats lost queries: {frozen.stats}')
+    for change in (lambda: frozen.add_flight(random_flight(random.Random(0), 10 ** 6)),
+                   lambda: frozen.remove_flight(next(iter(flights))),
+                   lambda: frozen.update_flight(next(iter(flights)), fare=1)):
+        try:
+            change()
+            errors.append('a FrozenPlanner accepted a change')
+        except TypeError:
+            pass
+    return report(errors)
+
+
+def check_holder(flights, options):
+    """Readers always see a whole published version while changes are applied behind them"""
+    rng = random.Random(len(flights))
+    expected = {0: expected_summaries(flights)}
+    holder = PlannerHolder(Planner(list(flights.values()), **options), cache_size=20)
+    done = threading.Event()
+
+    def reader(seed, errors):
+        rng = random.Random(seed)
+        while not done.is_set():
+            planner = holder.planner
+            pair = rng.choice(PAIRS)
+            if summary(planner, *pair, T1, T2) != expected[planner.version][pair]:
+                errors.append(f'version {planner.version} answered {pair} differently')
+
+    errors = []
+    threads = start_readers(reader, errors)
+    with holder:
+        next_no = max(flights) + 1
+        for version in range(1, 13):
+            # The answers of a version are known before it is submitted, readers may
+            # pick it up as soon as it is published
+            if version % 3 == 0:
+                flight_no = rng.choice(list(flights))
+                del flights[flight_no]
+                expected[version] = expected_summaries(flights)
+                future = holder.remove_flight(flight_no)
+            elif version % 3 == 1:
+                flight = random_flight(rng, next_no)
+                next_no += 1
+                flights[flight.flight_no] = flight
+                expected[version] = expected_summaries(flights)
+                future = holder.add_flight(flight)
+            else:
+                f = flights[rng.choice(list(flights))]
+                fare = rng.randint(10, MAX_FARE)
+                flights[f.flight_no] = Flight(f.flight_no, f.start_city, f.departure_time, f.end_city, f.arrival_time, fare)
+                expected[version] = expected_summaries(flights)
+                future = holder.update_flight(f.flight_no, fare=fare)
+            if future.result().version != version:
+                errors.append(f'change {version} was published as version {future.result().version}')
+        # A change that fails leaves the current version in place
+        try:
+            holder.remove_flight(-1).result()
+            errors.append('removing an unknown flight did not raise')
+        except ValueError:
+            pass
+        if holder.planner.version != 12:
+            errors.append(f'a failed change was published as version {holder.planner.version}')
+    done.set()
+    for thread in threads:
+        thread.join()
+    return report(errors)
+
+
+def report(errors):
+    if errors:
+        print('Validation failed:', errors[0])
+        print(f'{len(errors)} errors in all')
+    return not errors
+
+
+def run_tests():
+    for seed, options in enumerate(({}, {"astar": True}, {"backend": "csa", "queue": "dial"})):
+        flights = {f.flight_no: f for f in generate_flights(random.Random(seed), 60)}
+        if not (check_frozen(dict(flights), options) and check_holder(dict(flights), options)):
+            print(f'{options=}')
+            return
+    print('Passed FrozenPlanner and PlannerHolder')
+
+
+if __name__ == "__main__":
+    run_tests()
@@ -0,0 +1,32 @@
+from flight import Flight
+from planner import Planner
+from queries_tc import run_checks, fare
+
+
+def validate_k_cheapest(planner, query, all_routes, k):
+    """k_cheapest_routes gives k distinct routes whose fares are the k lowest"""
+    routes = planner.k_cheapest_routes(*query, k)
+    expected = sorted(fare(r) for r in all_routes)[:k]
+    got = [fare(r) for r in routes]
+    distinct = len({tuple(f.flight_no for f in r) for r in routes}) == len(routes)
+    return got == expected and distinct, routes, (got, expected)
+
+
+def check_flight_reuse():
+    """With zero connection and flight times a route could take a flight twice"""
+    flights = [Flight(0, 0, 10, 1, 10, 1), Flight(1, 1, 10, 0, 10, 1), Flight(2, 1, 10, 2, 10, 5)]
+    routes = Planner(flights, min_connection=0).k_cheapest_routes(0, 2, 0, 100, 5)
+    if [[f.flight_no for f in route] for route in routes] != [[0, 2]]:
+        print('Validation failed: k_cheapest_routes took a flight twice')
+        print('your routes:', [[f.flight_no for f in route] for route in routes])
+        return False
+    return True
+
+
+def run_tests():
+    if check_flight_reuse() and run_checks((("k_cheapest_routes", validate_k_cheapest, (1, 3, 10, 1000)),)):
+        print('Passed k_cheapest_routes')
+
+
+if __name__ == "__main__":
+    run_tests()
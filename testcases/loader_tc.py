@@ -0,0 +1,72 @@
+import os
+import random
+import tempfile
+from flight import Flight
+from loader import read_test_cases, read_edge_list
+from maintester import load_test_cases_from_file
+from bench_queues import load_edge_list
+from update_tc import generate_flights
+
+# Tiny chunks cut numbers, lines and test cases at every possible place
+CHUNK_SIZES = (5, 64, 4096, 1 << 20)
+
+
+def rows(table):
+    return [table.flight(row).as_tuple() for row in range(len(table))]
+
+
+def write_test_cases(path, rng):
+    """A multi-test-case file with an empty test case and negative fares"""
+    cases = []
+    for i in range(6):
+        flights = generate_flights(rng, 0 if i == 2 else rng.randint(1, 40))
+        flights = [f if rng.random() < 0.9 else
+                   Flight(f.flight_no, f.start_city, f.departure_time, f.end_city, f.arrival_time, -f.fare)
+                   for f in flights]
+        cases.append((flights, rng.randrange(8), rng.randrange(8), rng.randrange(100), rng.randrange(300, 700)))
+    with open(path, "w") as file:
+        file.write(f"{len(cases)}\n")
+        for flights, *query in cases:
+            file.write(f"{len(flights)}\n")
+            for f in flights:
+                file.write(" ".join(map(str, f.as_tuple())) + "\n")
+            file.write(" ".join(map(str, query)) + "\n")
+
+
+def check_test_cases(path):
+    expected = [([f.as_tuple() for f in flights], query) for flights, *query in load_test_cases_from_file(path)]
+    for chunk_size in CHUNK_SIZES:
+        got = [(rows(table), query) for table, *query in read_test_cases(path, chunk_size)]
+        if got != expected:
+            print(f'Validation failed: read_test_cases with chunk_size {chunk_size} disagrees with line parsing')
+            return False
+    return True
+
+
+def check_edge_list(path):
+    expected = [f.as_tuple() for f in load_edge_list(path)]
+    for chunk_size in CHUNK_SIZES[1:]:
+        if rows(read_edge_list(path, chunk_size)) != expected:
+            print(f'Validation failed: read_edge_list of {path} with chunk_size {chunk_size} disagrees with line parsing')
+            return False
+    return True
+
+
+def run_tests():
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "cases.txt")
+        write_test_cases(path, random.Random(4))
+        if not check_test_cases(path):
+            return
+        # The last line of an edge list may have no newline
+        path = os.path.join(directory, "edges.txt")
+        with open(path, "w") as file:
+            file.write("3 3\n0 1 10 5 30\n1 2 -4 60 90\n2 0 7 100 140")
+        if not check_edge_list(path):
+            return
+    if check_edge_list("c.txt"):
+        print('Passed read_test_cases and read_edge_list')
+
+
+if __name__ == "__main__":
+    run_tests()
@@ -0,0 +1,18 @@
+from queries_tc import run_checks, fare
+
+
+def validate_max_flights(planner, query, all_routes, max_flights):
+    """cheapest_route with max_flights is the cheapest route of at most max_flights flights"""
+    route = planner.cheapest_route(*query, max_flights=max_flights)
+    expected = min((fare(r) for r in all_routes if len(r) <= max_flights), default=None)
+    got = fare(route) if route else None
+    return got == expected and len(route) <= max_flights, [route], (got, expected)
+
+
+def run_tests():
+    if run_checks((("cheapest_route with max_flights", validate_max_flights, (0, 1, 2, 3, 10)),)):
+        print('Passed cheapest_route with max_flights')
+
+
+if __name__ == "__main__":
+    run_tests()
@@ -0,0 +1,50 @@
+import random
+from parallel import ParallelPlanner
+from planner import Planner
+from alam_tc import generate_random_flights
+from batch_tc import make_queries
+from update_tc import generate_flights, random_change
+
+
+def as_tuples(results):
+    return [[[f.as_tuple() for f in route] for route in routes] for routes in results]
+
+
+def check_pool(planner, queries, workers):
+    """The workers run the same search on the shared table, so the routes must be identical"""
+    expected = planner.batch_query(queries)
+    with ParallelPlanner(planner, workers) as pool:
+        for objectives in (Planner.OBJECTIVES, ("cheapest",)):
+            got = pool.batch_query(queries, objectives)
+            picks = [Planner.OBJECTIVES.index(objective) for objective in objectives]
+            if as_tuples(got) != as_tuples([[routes[k] for k in picks] for routes in expected]):
+                print(f'Validation failed: ParallelPlanner with {workers} workers disagrees with batch_query')
+                return False
+        if pool.batch_query([]) != []:
+            print('Validation failed: ParallelPlanner answered an empty batch')
+            return False
+    return True
+
+
+def run_tests():
+    rng = random.Random(3)
+    flights = {f.flight_no: f for f in generate_flights(rng, 80)}
+    planner = Planner(list(flights.values()))
+    queries = make_queries(rng, 200)
+    if not check_pool(planner, queries, 2):
+        return
+    # Removed and updated flights stay in the exported arrays, the workers must skip them
+    removed, next_no = [], len(flights)
+    for _ in range(20):
+        next_no = random_change(rng, planner, flights, removed, next_no)
+    if not check_pool(planner, queries, 3):
+        return
+    random.seed(3)
+    large = Planner(generate_random_flights(50, 5000, 3000, 300))
+    queries = [(rng.randrange(50), rng.randrange(50), 0, rng.randrange(500, 3000)) for _ in range(100)]
+    if check_pool(large, queries, 4):
+        print('Passed ParallelPlanner')
+
+
+if __name__ == "__main__":
+    run_tests()
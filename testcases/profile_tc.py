@@ -0,0 +1,21 @@
+from queries_tc import run_checks
+
+
+def validate_profile(planner, query, all_routes, argument):
+    """profile_routes gives exactly the Pareto optimal (departure, arrival, flights) triples"""
+    labels = {(r[0].departure_time, r[-1].arrival_time, len(r)) for r in all_routes}
+    expected = sorted(label for label in labels
+                      if not any(other != label and other[0] >= label[0] and other[1] <= label[1]
+                                 and other[2] <= label[2] for other in labels))
+    routes = planner.profile_routes(*query)
+    got = [(r[0].departure_time, r[-1].arrival_time, len(r)) for r in routes]
+    return got == expected, routes, (got, expected)
+
+
+def run_tests():
+    if run_checks((("profile_routes", validate_profile, (None,)),)):
+        print('Passed profile_routes')
+
+
+if __name__ == "__main__":
+    run_tests()
@@ -0,0 +1,103 @@
+import random
+from flight import Flight
+from planner import Planner
+
+NUM_CITIES = 6
+NUM_FLIGHTS = 40
+MAX_TIME = 400
+MAX_FARE = 50
+
+
+def generate_flights(rng, hubs):
+    """Random flights, about half of them out of city 0 when hubs is set; some take no time"""
+    flights = []
+    for flight_no in range(NUM_FLIGHTS):
+        start_city = 0 if hubs and rng.random() < 0.5 else rng.randrange(NUM_CITIES)
+        end_city = rng.randrange(NUM_CITIES)
+        while end_city == start_city:
+            end_city = rng.randrange(NUM_CITIES)
+        departure_time = rng.randint(0, MAX_TIME)
+        arrival_time = departure_time + rng.randint(0, 100)
+        flights.append(Flight(flight_no, start_city, departure_time, end_city, arrival_time, rng.randint(0, MAX_FARE)))
+    return flights
+
+
+def generate_all_possible_routes(flights, start_city, end_city, t1, t2, min_connection):
+    """Every route, by depth-first search; a route never takes the same flight twice"""
+    adj_map_flights = {}
+    for flight in flights:
+        adj_map_flights.setdefault(flight.start_city, []).append(flight)
+    all_routes = []
+
+    def dfs(current_city, current_route, current_time):
+        if current_city == end_city and current_route:
+            all_routes.append(list(current_route))
+            return
+        for flight in adj_map_flights.get(current_city, []):
+            if flight.arrival_time > t2 or flight in current_route:
+                continue
+            if not current_route:
+                if flight.departure_time < t1:
+                    continue
+            elif flight.departure_time < current_time + min_connection[current_city]:
+                continue
+            current_route.append(flight)
+            dfs(flight.end_city, current_route, flight.arrival_time)
+            current_route.pop()
+
+    dfs(start_city, [], t1)
+    return all_routes
+
+
+def is_valid(route, start_city, end_city, t1, t2, min_connection):
+    if not route:
+        return True
+    if route[0].start_city != start_city or route[-1].end_city != end_city:
+        return False
+    if route[0].departure_time < t1 or route[-1].arrival_time > t2:
+        return False
+    if len(set(f.flight_no for f in route)) != len(route):
+        return False
+    for prev, flight in zip(route, route[1:]):
+        if prev.end_city != flight.start_city or flight.departure_time < prev.arrival_time + min_connection[prev.end_city]:
+            return False
+    return True
+
+
+def fare(route):
+    return sum(f.fare for f in route)
+
+
+def run_checks(checks):
+    """Run every (name, validate, arguments) of checks on each city pair of random networks
+
+    validate(planner, query, all_routes, argument) returns (ok, routes, (got, expected));
+    routes must also be valid. Returns True when every check passed.
+    """
+    for seed in range(30):
+        rng = random.Random(seed)
+        flights = generate_flights(rng, hubs=seed % 2 == 0)
+        # Every third network has per-city connection times, zero for some cities
+        if seed % 3 == 0:
+            per_city = {city: rng.choice([0, 10, 40]) for city in range(NUM_CITIES)}
+            min_connection = [per_city[city] for city in range(NUM_CITIES)]
+        else:
+            per_city = 20
+            min_connection = [20] * NUM_CITIES
+        planner = Planner(flights, min_connection=per_city, cache_size=10 * (seed % 2))
+        t1, t2 = (0, MAX_TIME + 100) if seed % 4 else (60, 320)
+        for start_city in range(NUM_CITIES):
+            for end_city in range(NUM_CITIES):
+                if start_city == end_city:
+                    continue
+                all_routes = generate_all_possible_routes(flights, start_city, end_city, t1, t2, min_connection)
+                for name, validate, arguments in checks:
+                    for argument in arguments:
+                        query = (start_city, end_city, t1, t2)
+                        ok, routes, (got, expected) = validate(planner, query, all_routes, argument)
+                        if not ok or not all(is_valid(r, start_city, end_city, t1, t2, min_connection) for r in routes):
+                            print(f"Validation failed on {name}({argument}): {seed=}, {start_city=}, {end_city=}")
+                            print('your answer:', got)
+                            print('expected:   ', expected)
+                            return False
+    return True
@@ -0,0 +1,103 @@
+import asyncio
+import json
+import os
+import random
+import tempfile
+from planner import Planner
+from server import PlannerServer
+from update_tc import generate_flights, NUM_CITIES, MAX_TIME
+
+NUM_CLIENTS = 4
+# Requests with a missing field, an unknown objective and an unknown op
+BAD_REQUESTS = ("missing", "objective", "op")
+
+
+async def client(connect, requests):
+    """Send every request at once on one connection, return the replies by id"""
+    reader, writer = await connect()
+    for request in requests:
+        writer.write(json.dumps(request).encode() + b"\n")
+    await writer.drain()
+    replies = {}
+    for _ in requests:
+        reply = json.loads(await reader.readline())
+        replies[reply["id"]] = reply
+    writer.close()
+    return replies
+
+
+def make_requests(rng):
+    requests = []
+    for i in range(200):
+        request = {"id": i, "start_city": rng.randrange(NUM_CITIES), "end_city": rng.randrange(NUM_CITIES),
+                   "t1": rng.choice([0, 100]), "t2": MAX_TIME + 200}
+        if i % 5 == 0:
+            request["objectives"] = ["cheapest"]
+        requests.append(request)
+    # The same query from every client, so some of them are coalesced
+    requests += [{"id": f"same{i}", "start_city": 0, "end_city": 1, "t1": 0, "t2": 300} for i in range(NUM_CLIENTS)]
+    requests += [{"id": "missing", "start_city": 1},
+                 {"id": "objective", "start_city": 1, "end_city": 2, "t1": 0, "t2": 5, "objectives": ["fastest"]},
+                 {"id": "op", "op": "reload"}]
+    return requests
+
+
+def check_replies(reference, requests, replies):
+    for request in requests:
+        reply = replies[request["id"]]
+        if request["id"] in BAD_REQUESTS:
+            if "error" not in reply:
+                print(f'Validation failed: the bad request {request} got no error')
+                return False
+            continue
+        if "error" in reply:
+            print(f'Validation failed: request {request} got an error: {reply["error"]}')
+            return False
+        objectives = request.get("objectives", Planner.OBJECTIVES)
+        query = (request["start_city"], request["end_city"], request["t1"], request["t2"])
+        expected = reference.batch_query([query], objectives)[0]
+        if reply["routes"] != {objective: [list(f.as_tuple()) for f in route] for objective, route in zip(objectives, expected)}:
+            print(f'Validation failed: the server answer to {request} differs from batch_query')
+            return False
+    return True
+
+
+async def check_server(flights, workers, directory):
+    server = PlannerServer(Planner(flights), workers=workers)
+    if workers:
+        path = os.path.join(directory, "planner.sock")
+        await server.start(path)
+        connect = lambda: asyncio.open_unix_connection(path)
+    else:
+        listener = await server.start()
+        port = listener.sockets[0].getsockname()[1]
+        connect = lambda: asyncio.open_connection("127.0.0.1", port)
+    try:
+        requests = make_requests(random.Random(workers))
+        parts = await asyncio.gather(*(client(connect, requests[k::NUM_CLIENTS]) for k in range(NUM_CLIENTS)))
+        replies = {}
+        for part in parts:
+            replies.update(part)
+        if not check_replies(Planner(flights), requests, replies):
+            return False
+        stats = (await client(connect, [{"id": 0, "op": "stats"}]))[0]["stats"]
+        if stats["requests"] != len(requests) - len(BAD_REQUESTS) or stats["queries"] + stats["coalesced"] != stats["requests"]:
+            print(f'Validation failed: server counters {stats}')
+            return False
+    finally:
+        await server.close()
+    return True
+
+
+def run_tests():
+    flights = generate_flights(random.Random(6), 60)
+    with tempfile.TemporaryDirectory() as directory:
+        for workers in (0, 2):
+            if not asyncio.run(check_server(flights, workers, directory)):
+                print(f'{workers=}')
+                return
+    print('Passed PlannerServer')
+
+
+if __name__ == "__main__":
+    run_tests()
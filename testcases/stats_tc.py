@@ -0,0 +1,123 @@
+import random
+from planner import Planner
+from update_tc import generate_flights, NUM_CITIES, MAX_TIME
+
+T1, T2 = 0, MAX_TIME + 200
+
+# (name, query method): every kind of query records its SearchStats
+QUERIES = (
+    ("least_flights_earliest_route", lambda p, *q: p.least_flights_earliest_route(*q)),
+    ("cheapest_route", lambda p, *q: p.cheapest_route(*q)),
+    ("least_flights_cheapest_route", lambda p, *q: p.least_flights_cheapest_route(*q)),
+    ("cheapest_route with max_flights", lambda p, *q: p.cheapest_route(*q, max_flights=2)),
+    ("plan_all", lambda p, *q: p.plan_all(*q)),
+    ("profile_routes", lambda p, *q: p.profile_routes(*q)),
+    ("k_cheapest_routes", lambda p, *q: p.k_cheapest_routes(*q, 3)),
+    ("earliest_route_within_budget", lambda p, *q: p.earliest_route_within_budget(*q, 400)),
+)
+
+
+def fail(name, message, stats):
+    print(f'Validation failed on {name}: {message}')
+    print('last_stats:', stats)
+    return False
+
+
+def flight_nos(answer):
+    """Flight numbers of an answer that is a route or a list or tuple of routes"""
+    if answer and not isinstance(answer[0], (list, tuple)):
+        return [f.flight_no for f in answer]
+    return [flight_nos(route) for route in answer]
+
+
+def has_route(nos):
+    return any(has_route(item) if isinstance(item, list) else True for item in nos)
+
+
+def check_queries(planner, plain):
+    """Stats never change an answer, and a search records its work and phases"""
+    total = Planner.SearchStats()
+    for name, run in QUERIES:
+        for end_city in range(1, NUM_CITIES):
+            query = (0, end_city, T1, T2)
+            answer = flight_nos(run(planner, *query))
+            if answer != flight_nos(run(plain, *query)):
+                return fail(name, f'the answer to {query} changed with stats on', planner.last_stats)
+            stats = planner.last_stats
+            if stats.queries != 1 or stats.cache_hits != 0:
+                return fail(name, 'one query, answered without the cache, expected', stats)
+            if stats.rejected:
+                if stats.pops or "search" in stats.phases:
+                    return fail(name, 'a rejected query ran a search', stats)
+            elif set(stats.phases) != {"search", "routes"}:
+                return fail(name, 'a search without its phases', stats)
+            elif has_route(answer) and (stats.pops == 0 or stats.candidates == 0):
+                return fail(name, 'a route found with no work counted', stats)
+            total += stats
+    if any(getattr(planner.stats, counter) != getattr(total, counter) for counter in Planner.SearchStats.COUNTERS):
+        return fail('stats', 'the summed stats are not the sum of the queries', planner.stats)
+    return True
+
+
+def check_rejected(planner):
+    """A city out of the network is rejected by the reachability index, cache or no cache"""
+    for name, run in QUERIES:
+        run(planner, 0, NUM_CITIES + 5, T1, T2)
+        stats = planner.last_stats
+        if stats.rejected != 1 or stats.cache_hits or stats.pops or "search" in stats.phases or "cache" in stats.phases:
+            return fail(name, 'a query to an unknown city must be rejected without a search', stats)
+    return True
+
+
+def check_cache(planner):
+    for name, run in QUERIES:
+        run(planner, 0, 1, T1, T2)
+        stats = planner.last_stats
+        if stats.cache_hits != 0 or not {"cache", "search"} <= set(stats.phases):
+            return fail(name, 'the first query must miss the cache and search', stats)
+        run(planner, 0, 1, T1, T2)
+        stats = planner.last_stats
+        if stats.cache_hits != 1 or stats.pops or "search" in stats.phases:
+            return fail(name, 'the repeated query must be answered from the cache', stats)
+    return True
+
+
+def check_batch(planner):
+    queries = [(0, end_city, T1, T2) for end_city in range(NUM_CITIES + 2)]
+    planner.batch_query(queries)
+    stats = planner.last_stats
+    if stats.queries != len(queries) or stats.rejected != 2 or stats.cache_hits:
+        return fail('batch_query', 'every query counted, the two unknown cities rejected', stats)
+    planner.batch_query(queries)
+    stats = planner.last_stats
+    if stats.cache_hits != len(queries) - 3 or stats.pops:
+        return fail('batch_query', 'the repeated batch must be answered from the cache', stats)
+    return True
+
+
+def check_off(planner):
+    planner.set_stats(False)
+    planner.cheapest_route(0, 1, T1, T2)
+    if planner.stats is not None or planner.last_stats is not None:
+        return fail('set_stats', 'stats turned off still recorded', planner.last_stats)
+    return True
+
+
+def run_tests():
+    for seed in range(5):
+        flights = generate_flights(random.Random(seed), 60)
+        for options in ({}, {"backend": "csa"}, {"queue": "dial"}, {"astar": True}):
+            planner = Planner(flights, stats=True, **options)
+            if not check_queries(planner, Planner(flights, **options)) or not check_rejected(planner):
+                print(f'{seed=}, {options=}')
+                return
+        cached = Planner(flights, stats=True, cache_size=100)
+        if not (check_rejected(cached) and check_cache(cached) and check_batch(Planner(flights, stats=True, cache_size=100))
+                and check_off(cached)):
+            print(f'{seed=}')
+            return
+    print('Passed SearchStats')
+
+
+if __name__ == "__main__":
+    run_tests()
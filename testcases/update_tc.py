@@ -0,0 +1,157 @@
+import os
+import random
+import tempfile
+from flight import Flight
+from planner import Planner
+
+NUM_CITIES = 8
+MAX_TIME = 500
+MAX_FARE = 300
+MIN_CONNECTION = 20
+
+
+def generate_flights(rng, num_flights, first_no=0):
+    flights = []
+    for flight_no in range(first_no, first_no + num_flights):
+        flights.append(random_flight(rng, flight_no))
+    return flights
+
+
+def random_flight(rng, flight_no):
+    start_city = rng.randrange(NUM_CITIES)
+    end_city = rng.randrange(NUM_CITIES)
+    while end_city == start_city:
+        end_city = rng.randrange(NUM_CITIES)
+    departure_time = rng.randint(0, MAX_TIME)
+    arrival_time = departure_time + rng.randint(20, 100)
+    return Flight(flight_no, start_city, departure_time, end_city, arrival_time, rng.randint(10, MAX_FARE))
+
+
+def is_valid(route, start_city, end_city, t1, t2):
+    if not route:
+        return True
+    if route[0].start_city != start_city or route[-1].end_city != end_city:
+        return False
+    if route[0].departure_time < t1 or route[-1].arrival_time > t2:
+        return False
+    for prev, flight in zip(route, route[1:]):
+        if prev.end_city != flight.start_city or flight.departure_time < prev.arrival_time + MIN_CONNECTION:
+            return False
+    return True
+
+
+def summary(planner, start_city, end_city, t1, t2):
+    """What any correct planner must agree on: the objective values of every answer
+
+    Ties may be broken differently, so routes are compared by their objectives only.
+    """
+    earliest = planner.least_flights_earliest_route(start_city, end_city, t1, t2)
+    cheapest = planner.cheapest_route(start_city, end_city, t1, t2)
+    least_cheapest = planner.least_flights_cheapest_route(start_city, end_city, t1, t2)
+    routes = (earliest, cheapest, least_cheapest) + planner.plan_all(start_city, end_city, t1, t2)
+    for route in routes:
+        if not is_valid(route, start_city, end_city, t1, t2):
+            return "invalid route " + str([f.flight_no for f in route])
+    keys = []
+    for k, route in enumerate(routes):
+        fare = sum(f.fare for f in route)
+        if not route:
+            keys.append(None)
+        elif k % 3 == 0:
+            keys.append((len(route), route[-1].arrival_time))
+        elif k % 3 == 1:
+            keys.append(fare)
+        else:
+            keys.append((len(route), fare))
+    return keys
+
+
+def matches_fresh(planner, flights, t1, t2):
+    """Compare planner with a Planner built from scratch over the same flights"""
+    fresh = Planner(list(flights.values()))
+    for start_city in range(NUM_CITIES):
+        for end_city in range(NUM_CITIES):
+            if start_city == end_city:
+                continue
+            got = summary(planner, start_city, end_city, t1, t2)
+            expected = summary(fresh, start_city, end_city, t1, t2)
+            if got != expected:
+                print(f'start:{start_city}, end:{end_city}')
+                print('updated planner:', got)
+                print('fresh planner:  ', expected)
+                return False
+    return True
+
+
+def random_change(rng, planner, flights, removed, next_no):
+    """Apply one random add, remove or update to planner and flights, return the next free flight_no"""
+    op = rng.random()
+    if op < 0.35 or not flights:
+        # Flight numbers of removed flights are sometimes scheduled again
+        if removed and rng.random() < 0.5:
+            flight_no = removed.pop(rng.randrange(len(removed)))
+        else:
+            flight_no, next_no = next_no, next_no + 1
+        flight = random_flight(rng, flight_no)
+        planner.add_flight(flight)
+        flights[flight_no] = flight
+    elif op < 0.6:
+        flight_no = rng.choice(list(flights))
+        if planner.remove_flight(flight_no) != flights.pop(flight_no):
+            raise AssertionError(f"remove_flight({flight_no}) returned the wrong flight")
+        removed.append(flight_no)
+    else:
+        flight_no = rng.choice(list(flights))
+        flight = flights[flight_no]
+        departure_time = flight.departure_time + rng.randint(0, 60)
+        arrival_time = departure_time + rng.randint(20, 100)
+        fare = flight.fare if rng.random() < 0.3 else rng.randint(10, MAX_FARE)
+        if rng.random() < 0.3:
+            # A fare-only change
+            departure_time, arrival_time = flight.departure_time, flight.arrival_time
+        changed = Flight(flight_no, flight.start_city, departure_time, flight.end_city, arrival_time, fare)
+        flights[flight_no] = changed
+        if planner.update_flight(flight_no, departure_time, arrival_time, fare) != changed:
+            raise AssertionError(f"update_flight({flight_no}) returned the wrong flight")
+    return next_no
+
+
+def check_updates(name, planner, flights, removed, rng, steps, t1, t2):
+    next_no = 1 + max(list(flights) + removed, default=-1)
+    for step in range(steps):
+        next_no = random_change(rng, planner, flights, removed, next_no)
+        if not matches_fresh(planner, flights, t1, t2):
+            print(f'Failed on {name}, after change {step + 1}')
+            return False
+    return True
+
+
+def run_tests():
+    t1, t2 = 0, MAX_TIME + 200
+    for seed in range(10):
+        rng = random.Random(seed)
+        flights = {f.flight_no: f for f in generate_flights(rng, 40)}
+        removed = []
+        planner = Planner(list(flights.values()), cache_size=20 * (seed % 2), queue=Planner.QUEUES[seed % 3])
+        if not check_updates(f'updates, seed {seed}', planner, flights, removed, rng, 15, t1, t2):
+            return
+
+        # The snapshot holds the removed rows too; reopened planners must still treat
+        # them as unscheduled
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "planner.snap")
+            planner.save(path)
+            for mmap in (True, False):
+                loaded = Planner.load(path, mmap=mmap)
+                if not matches_fresh(loaded, flights, t1, t2):
+                    print(f'Failed on snapshot, seed {seed}, {mmap=}')
+                    return
+                if not check_updates(f'updates after load, seed {seed}, {mmap=}', loaded, dict(flights),
+                                     list(removed), random.Random(seed), 15, t1, t2):
+                    return
+                del loaded
+    print('Passed updates')
+
+
+if __name__ == "__main__":
+    run_tests()